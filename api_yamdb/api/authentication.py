@@ -0,0 +1,72 @@
+"""Authentication classes."""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """LRU cache of authenticated users with a time to live.
+
+    The cache lives in the memory of a worker process. Entries are dropped
+    by the user signals of that process, so changes made by other workers
+    are seen after at most `AUTH_USER_CACHE_TIMEOUT` seconds.
+    """
+
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return a copy of the cached user or None."""
+        key = str(user_id)
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is None:
+                return None
+            expires, user = entry
+            if expires <= time.monotonic():
+                del self._users[key]
+                return None
+            self._users.move_to_end(key)
+        # Views may change request.user, the cached instance stays intact.
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        key = str(user_id)
+        expires = time.monotonic() + settings.AUTH_USER_CACHE_TIMEOUT
+        with self._lock:
+            self._users[key] = (expires, copy.copy(user))
+            self._users.move_to_end(key)
+            while len(self._users) > settings.AUTH_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._users.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication resolving token subjects through `user_cache`."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            user = user_cache.get(user_id)
+            if user is not None:
+                return user
+        user = super().get_user(validated_token)
+        user_cache.set(user_id, user)
+        return user
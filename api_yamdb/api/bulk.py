@@ -0,0 +1,237 @@
+"""Bulk creation and update of catalog objects."""
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.validators import UniqueValidator
+
+from reviews import search
+from reviews.models import Category, Genre, Title
+
+from .cache import bump_version
+from .serializers import PreloadedSlugRelatedField, narrow_queryset
+
+CREATED = "created"
+UPDATED = "updated"
+
+
+def preload_slugs(serializer, items):
+    """Fetch the objects referred to by slugs of the items.
+
+    Every preloaded slug field of the serializer costs one query, whatever
+    the number of items.
+
+    Args:
+        serializer (Serializer): serializer of a single item
+        items (list): dicts of the request
+
+    Returns:
+        dict: objects by slug for every referenced model
+    """
+    preloaded = {}
+    for name, field in serializer.fields.items():
+        relation = getattr(field, "child_relation", field)
+        if field.read_only or not isinstance(
+                relation, PreloadedSlugRelatedField):
+            continue
+        slugs = set()
+        for item in items:
+            value = item.get(name)
+            values = value if isinstance(value, list) else [value]
+            slugs.update(slug for slug in values if isinstance(slug, str))
+        queryset = relation.get_queryset()
+        objects = preloaded.setdefault(queryset.model, {})
+        objects.update(
+            (getattr(obj, relation.slug_field), obj)
+            for obj in queryset.filter(
+                **{"%s__in" % relation.slug_field: slugs})
+        )
+    return preloaded
+
+
+class BulkWrite:
+    """Validation and saving of the items of a bulk request.
+
+    Items are matched to existing objects by the lookup field of the view:
+    matching items update their object, the other ones create objects.
+    Items referring to a missing primary key are rejected.
+    """
+
+    def __init__(self, view, items):
+        self.serializer_class = view.get_serializer_class()
+        self.context = view.get_serializer_context()
+        self.model = self.serializer_class.Meta.model
+        lookup = view.lookup_field
+        self.lookup_field = self.model._meta.get_field(
+            self.model._meta.pk.name if lookup == "pk" else lookup)
+        self.items = items
+        self.serializers = []
+        self.errors = []
+
+    def get_keys(self):
+        keys = []
+        for item in self.items:
+            try:
+                key = self.lookup_field.to_python(
+                    item.get(self.lookup_field.name))
+            except ValidationError:
+                key = None
+            keys.append(key)
+        return keys
+
+    def is_valid(self):
+        """Validate every item, querying once per referenced table.
+
+        Returns:
+            bool: whether all items are valid
+        """
+        self.context["slug_objects"] = preload_slugs(
+            self.serializer_class(context=self.context), self.items)
+        keys = self.get_keys()
+        existing = self.model.objects.in_bulk(
+            {key for key in keys if key is not None},
+            field_name=self.lookup_field.name,
+        )
+        seen = set()
+        for item, key in zip(self.items, keys):
+            instance = existing.get(key)
+            serializer = self.serializer_class(
+                instance,
+                data=item,
+                partial=instance is not None,
+                context=self.context,
+            )
+            lookup = serializer.fields.get(self.lookup_field.name)
+            if lookup is not None:
+                # New keys are checked against the preloaded objects.
+                lookup.validators = [
+                    validator for validator in lookup.validators
+                    if not isinstance(validator, UniqueValidator)
+                ]
+            serializer.is_valid()
+            errors = dict(serializer.errors)
+            if key is not None and key in seen:
+                errors[self.lookup_field.name] = ["Duplicated in the request."]
+            elif (instance is None and self.lookup_field.primary_key
+                    and item.get(self.lookup_field.name) is not None):
+                errors[self.lookup_field.name] = ["Object does not exist."]
+            seen.add(key)
+            self.serializers.append(serializer)
+            self.errors.append(errors)
+        return not any(self.errors)
+
+    def get_instances(self, many_to_many):
+        """Apply validated data to new and existing instances.
+
+        Returns:
+            tuple: created and updated instances, names of the updated
+                fields and many-to-many values of every instance
+        """
+        created, updated, changed_fields, relations = [], [], set(), []
+        for serializer in self.serializers:
+            data = dict(serializer.validated_data)
+            related = {
+                name: data.pop(name) for name in list(data)
+                if name in many_to_many
+            }
+            instance = serializer.instance
+            if instance is None:
+                instance = self.model(**data)
+                created.append(instance)
+            else:
+                for attr, value in data.items():
+                    setattr(instance, attr, value)
+                changed_fields.update(data)
+                if related:
+                    # Rewritten many-to-many values change the instance,
+                    # and set_many_to_many() sends no m2m_changed.
+                    changed_fields.update(
+                        field.name for field in self.get_auto_now_fields())
+                updated.append(instance)
+            relations.append((instance, related))
+        return created, updated, changed_fields, relations
+
+    def get_auto_now_fields(self):
+        return [
+            field for field in self.model._meta.concrete_fields
+            if getattr(field, "auto_now", False)
+        ]
+
+    def touch(self, instances, changed_fields):
+        """Set auto_now fields, which bulk_update() leaves as they are."""
+        if not changed_fields:
+            return
+        now = timezone.now()
+        for field in self.get_auto_now_fields():
+            changed_fields.add(field.name)
+            for instance in instances:
+                setattr(instance, field.attname, now)
+
+    @transaction.atomic
+    def save(self):
+        """Write the validated items in one transaction.
+
+        Returns:
+            list: status and representation of every item
+        """
+        many_to_many = {
+            field.name: field for field in self.model._meta.many_to_many
+        }
+        created, updated, changed_fields, relations = self.get_instances(
+            many_to_many)
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(created)
+        else:
+            # Primary keys of bulk inserted rows are unknown here.
+            for instance in created:
+                instance.save()
+        self.touch(updated, changed_fields)
+        if updated and changed_fields:
+            self.model.objects.bulk_update(updated, sorted(changed_fields))
+        for name, field in many_to_many.items():
+            self.set_many_to_many(field, [
+                (instance, related[name])
+                for instance, related in relations if name in related
+            ])
+        ids = [instance.pk for instance, _ in relations]
+        bump_version(self.model._meta.label_lower)
+        if self.model is Title:
+            search.index_titles(ids)
+        if self.model is Category and updated:
+            Title.objects.filter(category__in=updated).touch()
+        if self.model is Genre and updated:
+            Title.objects.filter(genre__in=updated).touch()
+        return self.get_results(ids, {instance.pk for instance in created})
+
+    @staticmethod
+    def set_many_to_many(field, values):
+        """Replace the related objects of the instances with bulk queries."""
+        if not values:
+            return
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        through.objects.filter(**{
+            "%s__in" % source: [instance.pk for instance, _ in values]
+        }).delete()
+        through.objects.bulk_create([
+            through(**{
+                "%s_id" % source: instance.pk,
+                "%s_id" % target: related.pk,
+            })
+            for instance, objects in values
+            for related in objects
+        ])
+
+    def get_results(self, ids, created_ids):
+        serializer = self.serializer_class(context=self.context)
+        objects = narrow_queryset(
+            self.model.objects.filter(pk__in=ids), serializer).in_bulk()
+        return [
+            {
+                "status": CREATED if pk in created_ids else UPDATED,
+                "data": self.serializer_class(
+                    objects[pk], context=self.context).data,
+            }
+            for pk in ids
+        ]
@@ -0,0 +1,66 @@
+"""Versioned response cache helpers.
+
+Every cached namespace has a version counter stored in the cache itself.
+Cache keys embed the current version, so bumping the counter makes all
+previously cached responses of the namespace unreachable at once. With a
+shared backend (memcached, redis, database or file based cache) the counter
+is shared by all gunicorn workers; the local-memory backend keeps one
+counter per process and is meant for a single process.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def _initial_version():
+    # A counter recreated after eviction must never match keys cached
+    # under the old counter, so it restarts from the current time.
+    return time.time_ns()
+
+
+def get_version(namespace):
+    """Return the current version of a cache namespace."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(namespace):
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def bump_version(namespace):
+    """Invalidate every response cached in a namespace.
+
+    The version is bumped once the current transaction commits: a read
+    between an earlier bump and the commit would cache the old rows under
+    the new version.
+    """
+    transaction.on_commit(lambda: _bump(namespace))
+
+
+def response_cache_key(namespace, request):
+    """Build the cache key of a request's response in a namespace."""
+    url_hash = hashlib.md5(
+        request.build_absolute_uri().encode()
+    ).hexdigest()
+    return f"{namespace}:{get_version(namespace)}:{url_hash}"
+
+
+def get_cache_timeout():
+    return getattr(settings, "LIST_CACHE_TIMEOUT", 300)
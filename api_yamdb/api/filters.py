@@ -1,25 +1,99 @@
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, NullIf
 from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
 from reviews.models import Title
+from reviews.search import search_titles
+
+ANY = 'any'
+ALL = 'all'
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Comma separated list of strings, e.g. `?genre=drama,comedy`."""
+
+
+class TitleOrderingFilter(filters.OrderingFilter):
+    """Ordering by model fields and by the stored average rating.
+
+    The rating is computed from the title's own score columns, so sorting
+    by it never joins reviews. Titles without reviews go last. No index
+    holds the computed rating: `?ordering=rating` sorts every filtered
+    title, unlike the model fields with (field, id) indexes.
+    """
+
+    def get_ordering_value(self, param):
+        descending = param.startswith('-')
+        if param.lstrip('-') != 'rating':
+            return super().get_ordering_value(param)
+        rating = (
+            Cast(F('score_sum'), FloatField())
+            / NullIf(F('review_count'), 0)
+        )
+        if descending:
+            return rating.desc(nulls_last=True)
+        return rating.asc(nulls_last=True)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        # The primary key makes the order of equal values stable. It goes
+        # the way of the last field, so that a (field, id) index is read in
+        # a single direction.
+        return qs.order_by(
+            *[self.get_ordering_value(param) for param in value],
+            '-pk' if value[-1].startswith('-') else 'pk'
+        )
 
 
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(
+    category = CharInFilter(
         field_name='category__slug',
-        lookup_expr='icontains'
+        lookup_expr='in'
     )
-    genre = filters.CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = filters.ChoiceFilter(
+        choices=((ANY, ANY), (ALL, ALL)),
+        method='keep_queryset',
+        help_text='Whether titles need `any` (default) or `all` genres.'
     )
     name = filters.CharFilter(
         field_name='name',
         lookup_expr='icontains'
     )
-    year = filters.NumberFilter(
+    year = filters.NumberFilter(field_name='year')
+    year_min = filters.NumberFilter(
         field_name='year',
-        lookup_expr='icontains'
+        lookup_expr='gte'
+    )
+    year_max = filters.NumberFilter(
+        field_name='year',
+        lookup_expr='lte'
+    )
+    q = filters.CharFilter(method='search')
+    ordering = TitleOrderingFilter(
+        fields=('year', 'name', 'rating')
     )
 
     class Meta:
         model = Title
         fields = '__all__'
+
+    def filter_genre(self, queryset, name, value):
+        """Exact genre slugs matched in a subquery, so titles never repeat."""
+        slugs = set(value)
+        title_genres = Title.genre.through.objects.filter(
+            genre__slug__in=slugs
+        ).values('title_id')
+        if self.form.cleaned_data.get('genre_mode') == ALL:
+            title_genres = title_genres.annotate(
+                matched=Count('genre_id')
+            ).filter(matched=len(slugs))
+        return queryset.filter(pk__in=title_genres.values('title_id'))
+
+    def keep_queryset(self, queryset, name, value):
+        return queryset
+
+    def search(self, queryset, name, value):
+        """Full-text search over names and descriptions, best first."""
+        return search_titles(queryset, value)
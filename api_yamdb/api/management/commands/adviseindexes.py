@@ -0,0 +1,206 @@
+"""Custom manage.py command suggesting indexes for the API queries."""
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Review, Title
+from users.models import ADMIN, User
+
+from api_yamdb.slowqueries import explain
+
+SQLITE_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\w+)(?!.*\bINDEX\b)")
+SQLITE_SORT = re.compile(r"\bUSE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY")
+POSTGRESQL_SCAN = re.compile(r"\bSeq Scan on (\w+)")
+POSTGRESQL_SORT = re.compile(r"(?:^|->)\s*(?:Incremental )?Sort\s*(?:\(|$)")
+CLAUSE_END = r"(?= GROUP BY | ORDER BY | LIMIT |$)"
+WHERE = re.compile(r" WHERE (.*?)" + CLAUSE_END)
+ORDER_BY = re.compile(r" ORDER BY (.*?)(?= LIMIT |$)")
+FROM = re.compile(r' FROM "(\w+)"')
+PATTERN = re.compile(r"\b(?:LIKE|GLOB)\b", re.IGNORECASE)
+
+# Cached responses would hide the queries.
+NO_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+class QueryRecorder:
+    """SELECTs of a replayed request, see `connection.execute_wrapper()`."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def get_columns(clause, table):
+    return list(dict.fromkeys(
+        re.findall(r'"%s"\."(\w+)"' % re.escape(table), clause)))
+
+
+def get_url(path, **params):
+    return "%s?%s" % (path, urlencode(params))
+
+
+def find_problems(sql, plan, tables):
+    """Return the table scans and sorts of a plan.
+
+    Returns:
+        list: descriptions and suggested indexes, None for the problems
+            a B-tree index does not solve
+    """
+    if connection.vendor == "postgresql":
+        scan, sort = POSTGRESQL_SCAN, POSTGRESQL_SORT
+    else:
+        scan, sort = SQLITE_SCAN, SQLITE_SORT
+    where = WHERE.search(sql)
+    problems = []
+    for line in plan.splitlines():
+        match = scan.search(line)
+        if match and match.group(1) in tables and where:
+            table = match.group(1)
+            columns = [
+                column for column in get_columns(where.group(1), table)
+                if column != "id"
+            ]
+            if not columns:
+                # Reading every row is what the query asks for.
+                continue
+            if PATTERN.search(where.group(1)):
+                problems.append((
+                    "pattern match on %s.%s, see the trigram indexes of"
+                    " PostgreSQL" % (table, ", ".join(columns)),
+                    None,
+                ))
+            else:
+                problems.append((
+                    "scan of %s" % table, "%s (%s)" % (
+                        table, ", ".join(columns)),
+                ))
+        if sort.search(line):
+            order_by = ORDER_BY.search(sql)
+            table = FROM.search(sql)
+            if order_by is None or table is None:
+                continue
+            if "(" in order_by.group(1):
+                problems.append(("sort on an expression", None))
+                continue
+            problems.append((
+                "sort of %s" % table.group(1), "%s (%s)" % (
+                    table.group(1),
+                    ", ".join(get_columns(order_by.group(1), table.group(1))),
+                ),
+            ))
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays representative GET requests of the API against the"
+        " current database, explains their queries and reports the table"
+        " scans and sorts an index would avoid. Run it on a copy of the"
+        " production data: plans of a small database are not telling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs of every query, the fastest one is reported.",
+        )
+
+    def get_urls(self):
+        title = Title.objects.order_by("-review_count", "pk").first()
+        if title is None:
+            raise CommandError("No titles to replay, load some first.")
+        titles = reverse("api:titles-list")
+        urls = [
+            titles,
+            get_url(titles, ordering="name"),
+            get_url(titles, ordering="-year"),
+            get_url(titles, year=title.year),
+            get_url(titles, name=title.name[1:4]),
+            reverse("api:titles-detail", args=[title.pk]),
+            reverse("api:reviews-list", args=[title.pk]),
+            reverse("api:genre-list"),
+            reverse("api:category-list"),
+        ]
+        category = Category.objects.order_by("pk").first()
+        if category is not None:
+            urls.append(get_url(titles, category=category.slug))
+        genre = Genre.objects.order_by("pk").first()
+        if genre is not None:
+            urls.append(get_url(titles, genre=genre.slug))
+        review = Review.objects.annotate(
+            comment_count=Count("comments")
+        ).order_by("-comment_count", "pk").first()
+        if review is not None:
+            urls.append(reverse(
+                "api:comments-list", args=[review.title_id, review.pk]))
+        if User.objects.filter(role=ADMIN).exists():
+            urls.append(get_url(reverse("api:user-list"), search="a"))
+        return urls
+
+    def time_query(self, sql, params, repeat):
+        best = None
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                duration = time.perf_counter() - started
+                best = duration if best is None else min(best, duration)
+        return best * 1000
+
+    def handle(self, *args, **options):
+        client = APIClient(
+            HTTP_HOST=(settings.ALLOWED_HOSTS or ["localhost"])[0].lstrip(
+                "*.") or "localhost")
+        admin = User.objects.filter(role=ADMIN).first()
+        if admin is not None:
+            client.force_authenticate(admin)
+        tables = set(connection.introspection.table_names())
+        suggestions = {}
+        total = 0
+        for url in self.get_urls():
+            recorder = QueryRecorder()
+            with override_settings(CACHES=NO_CACHE):
+                with connection.execute_wrapper(recorder):
+                    response = client.get(url)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                "GET %s: %s" % (url, response.status_code)))
+            for sql, params in recorder.queries:
+                duration = self.time_query(sql, params, options["repeat"])
+                total += duration
+                plan = explain(connection, sql, params)[1]
+                self.stdout.write("  %8.3f ms  %s" % (duration, sql[:120]))
+                if options["verbosity"] > 1:
+                    for line in plan.splitlines():
+                        self.stdout.write("              %s" % line)
+                for problem, index in find_problems(sql, plan, tables):
+                    self.stdout.write(self.style.WARNING(
+                        "              %s%s" % (
+                            problem, " -> index %s" % index if index else "")
+                    ))
+                    if index:
+                        suggestions.setdefault(index, []).append(url)
+        self.stdout.write("Total %.3f ms" % total)
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS("No missing indexes"))
+            return
+        self.stdout.write(self.style.WARNING("Missing indexes:"))
+        for index, urls in sorted(suggestions.items()):
+            self.stdout.write("  %s for %s" % (index, ", ".join(
+                sorted(set(urls)))))
@@ -0,0 +1,87 @@
+"""Custom manage.py command reading profiles of requests."""
+import json
+import pstats
+from collections import Counter
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_yamdb.profiling import get_profile_path, list_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Lists the requests profiled with the X-Profile header or the"
+        " profile query parameter. Given a profile id, prints the slowest"
+        " functions and the SQL of the request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "profile_id",
+            nargs="?",
+            help="Profile to summarize, the latest one with 'latest'.",
+        )
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            choices=("cumulative", "tottime", "ncalls"),
+            help="Order of the functions.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=25,
+            help="Number of functions printed.",
+        )
+
+    def handle(self, *args, **options):
+        profiles = list_profiles()
+        if options["profile_id"] is None:
+            for profile in profiles:
+                self.stdout.write(
+                    "%(id)s  %(status)s  %(ms)10.1f ms  %(count)4d queries"
+                    "  %(method)s %(path)s (%(user)s)"
+                    % dict(profile, count=len(profile["queries"]))
+                )
+            return
+        profile_id = options["profile_id"]
+        if profile_id == "latest":
+            if not profiles:
+                raise CommandError("No saved profiles")
+            profile_id = profiles[0]["id"]
+        try:
+            with open(get_profile_path(profile_id, "json")) as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            raise CommandError("Profile %s does not exist" % profile_id)
+        self.stdout.write(
+            "%(method)s %(path)s by %(user)s at %(created)s: %(status)s"
+            " in %(ms).1f ms" % profile
+        )
+        # OutputWrapper ends every write with a newline, pstats writes
+        # lines piece by piece.
+        stream = StringIO()
+        stats = pstats.Stats(
+            get_profile_path(profile_id, "prof"), stream=stream)
+        stats.strip_dirs().sort_stats(options["sort"])
+        stats.print_stats(options["limit"])
+        self.stdout.write(stream.getvalue())
+        self.write_queries(profile["queries"])
+
+    def write_queries(self, queries):
+        self.stdout.write(
+            "%d queries in %.1f ms"
+            % (len(queries), sum(query["ms"] for query in queries))
+        )
+        repeated = Counter(query["sql"] for query in queries)
+        for query in queries:
+            self.stdout.write(
+                "%8.1f ms  %s%s" % (
+                    query["ms"],
+                    query["sql"],
+                    self.style.WARNING(
+                        "  (run %d times)" % repeated[query["sql"]])
+                    if repeated[query["sql"]] > 1 else "",
+                )
+            )
@@ -0,0 +1,119 @@
+"""Custom manage.py command aggregating the slow query log."""
+import json
+import os
+import re
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from api_yamdb.slowqueries import get_log_path, get_plan_path
+
+# Full table scans of SQLite and PostgreSQL plans.
+SCANS = re.compile(r"\bSCAN (?!.*\bUSING\b.*INDEX\b)|\bSeq Scan\b")
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregates the slow query log by fingerprint, the SQL without"
+        " literals, and prints the statements with their calling views."
+        " Statements whose plan scans a whole table are marked with SCAN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sort",
+            default="total",
+            choices=("total", "count", "max"),
+            help="Order of the statements.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of statements printed.",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Print the plan of every statement.",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the log and the plans after printing them.",
+        )
+
+    def handle(self, *args, **options):
+        statements = self.aggregate()
+        if not statements:
+            self.stdout.write(self.style.SUCCESS("No slow queries"))
+        statements.sort(key=lambda stats: stats[options["sort"]],
+                        reverse=True)
+        for stats in statements[:options["limit"]]:
+            plan = self.get_plan(stats["fingerprint"])
+            scan = plan is not None and SCANS.search(plan["plan"])
+            self.stdout.write(
+                "%(fingerprint)s  %(count)6d x  total %(total)10.1f ms"
+                "  mean %(mean)8.1f ms  max %(max)8.1f ms" % stats
+                + (self.style.WARNING("  SCAN") if scan else "")
+            )
+            self.stdout.write("    %s" % stats["sql"])
+            self.stdout.write("    views: %s" % ", ".join(
+                "%s (%d)" % (view or "-", count)
+                for view, count in stats["views"].most_common()
+            ))
+            if options["plans"] and plan is not None:
+                self.stdout.write("    plan%s:" % (
+                    " (analyze)" if plan["analyze"] else ""))
+                for line in plan["plan"].splitlines():
+                    self.stdout.write("      %s" % line)
+        if options["clear"]:
+            self.clear(statements)
+
+    @staticmethod
+    def aggregate():
+        statements = {}
+        try:
+            with open(get_log_path()) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        for line in lines:
+            try:
+                query = json.loads(line)
+            except ValueError:
+                # A line being written by a worker.
+                continue
+            stats = statements.setdefault(query["fingerprint"], {
+                "fingerprint": query["fingerprint"],
+                "sql": query["sql"],
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "views": Counter(),
+            })
+            stats["count"] += 1
+            stats["total"] += query["ms"]
+            stats["max"] = max(stats["max"], query["ms"])
+            stats["views"][query["view"]] += 1
+        for stats in statements.values():
+            stats["mean"] = stats["total"] / stats["count"]
+        return list(statements.values())
+
+    @staticmethod
+    def get_plan(fingerprint):
+        try:
+            with open(get_plan_path(fingerprint)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def clear(statements):
+        for path in [get_log_path()] + [
+            get_plan_path(stats["fingerprint"]) for stats in statements
+        ]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
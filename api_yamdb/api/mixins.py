@@ -1,5 +1,21 @@
-"""Mixin class"""
-from rest_framework import mixins, viewsets
+"""Mixin classes"""
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .bulk import BulkWrite
+from .cache import get_cache_timeout, response_cache_key
+from .permissons import AdminOnly
+from .serializers import narrow_queryset
 
 
 class CreateListDestroyViewSet(
@@ -13,3 +29,158 @@ class CreateListDestroyViewSet(
     """
 
     pass
+
+
+class VersionedListCacheMixin:
+    """
+    A mixin that caches `list` responses until the listed model changes.
+
+    The cache namespace is the model label. Its version is bumped by the
+    model's save and delete signals, so writes made through the viewset's
+    `perform_create`/`perform_destroy` and through the admin invalidate
+    the cached lists before the next read.
+    """
+
+    def get_cache_namespace(self):
+        return self.get_queryset().model._meta.label_lower
+
+    def list(self, request, *args, **kwargs):
+        key = response_cache_key(self.get_cache_namespace(), request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, get_cache_timeout())
+        return response
+
+
+class NarrowQuerySetMixin:
+    """
+    A mixin that loads only what the serializer of a read action renders.
+
+    Fields dropped by `?fields=` are not selected, and relations are joined
+    or prefetched only when their fields are rendered. Fields the view
+    reads itself go to `narrowed_only_fields`.
+    """
+
+    narrowed_actions = ("list", "retrieve")
+    narrowed_only_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.narrowed_actions:
+            return queryset
+        serializer = self.get_serializer_class()(
+            context=self.get_serializer_context())
+        return narrow_queryset(
+            queryset, serializer, self.narrowed_only_fields)
+
+
+class BulkWriteMixin:
+    """
+    A mixin that adds an admin only `bulk/` endpoint to a viewset.
+
+    It takes a list of objects in the format of the viewset's serializer.
+    Objects matching an existing one by the viewset's `lookup_field` update
+    it, the other ones are created. Nothing is written unless every object
+    is valid; errors are returned in the order of the objects.
+    """
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        permission_classes=[IsAuthenticated, AdminOnly],
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not all(
+                isinstance(item, dict) for item in items):
+            return Response(
+                {"non_field_errors": ["Expected a list of objects."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {"non_field_errors": [
+                    "Send at most %d objects." % settings.BULK_MAX_ITEMS]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        write = BulkWrite(self, items)
+        if not write.is_valid():
+            return Response(write.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(write.save(), status=status.HTTP_200_OK)
+
+
+class ConditionalGetMixin:
+    """
+    A mixin answering conditional `list` and `retrieve` requests with 304.
+
+    The validators come from one aggregate query over the filtered
+    queryset: the number of rows and the latest of their `modified_fields`
+    timestamps. Both change when a rendered row is added, changed or
+    removed, so a matching `If-None-Match` is answered before the rows are
+    fetched and serialized. A removed row does not move the latest
+    timestamp, so lists send `Last-Modified` only when `list_last_modified`
+    says that removals touch one of the `modified_fields`.
+    """
+
+    modified_fields = ("updated_at",)
+    list_last_modified = False
+
+    def get_validators(self, queryset):
+        state = queryset.order_by().aggregate(
+            rows=Count("pk"),
+            **{
+                "modified_%d" % number: Max(field)
+                for number, field in enumerate(self.modified_fields)
+            },
+        )
+        rows = state.pop("rows")
+        modified = [value for value in state.values() if value is not None]
+        last_modified = max(modified) if modified else None
+        etag = hashlib.md5(repr((
+            self.request.get_full_path(),
+            self.request.accepted_media_type,
+            rows,
+            last_modified and last_modified.isoformat(),
+        )).encode()).hexdigest()
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+        return rows, quote_etag(etag), last_modified
+
+    def conditional(self, queryset, handler, send_last_modified):
+        rows, etag, last_modified = self.get_validators(queryset)
+        if not send_last_modified:
+            last_modified = None
+        response = None
+        if rows or self.action == "list":
+            response = get_conditional_response(
+                self.request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler()
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.filter_queryset(self.get_queryset()),
+            lambda: super(ConditionalGetMixin, self).list(
+                request, *args, **kwargs),
+            self.list_last_modified,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.conditional(
+            queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(
+                request, *args, **kwargs),
+            True,
+        )
@@ -0,0 +1,66 @@
+"""Pagination classes."""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Keyset pagination over publication date.
+
+    Pages are selected with `pub_date > position` instead of OFFSET and no
+    COUNT(*) is run, so every page costs the same as the first one.
+    """
+
+    ordering = ("pub_date", "id")
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Page number pagination with an opt-in cursor mode.
+
+    Clients switch to cursor pages with `?pagination=cursor`; the `next`
+    and `previous` links of a cursor page carry the `cursor` parameter.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_pagination_class = PubDateCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def is_cursor_request(self, request):
+        cursor_query_param = self.cursor_pagination_class.cursor_query_param
+        return (
+            request.query_params.get(self.mode_query_param) == self.cursor_mode
+            or cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_request(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Set to `cursor` to use cursor pagination.",
+            "schema": {"type": "string", "enum": [self.cursor_mode]},
+        })
+        return parameters + (
+            self.cursor_pagination_class()
+            .get_schema_operation_parameters(view)
+        )
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
@@ -17,7 +17,7 @@ class AuthorModeratorAdminOrReadOnly(permissions.BasePermission):
         return (request.method in permissions.SAFE_METHODS
                 or request.user.is_admin
                 or request.user.is_moderator
-                or obj.author == request.user)
+                or obj.author_id == request.user.id)
 
     def has_permission(self, request, view):
         return (request.method in permissions.SAFE_METHODS
@@ -2,35 +2,304 @@
 
 import re
 
-from django.shortcuts import get_object_or_404
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.validators import UniqueValidator
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import User
 
 
-class CategorySerializer(serializers.ModelSerializer):
+def get_query_list(request, name):
+    """Return the comma separated names of a query parameter.
+
+    Args:
+        request (Request): current request, may be None
+        name (str): name of the query parameter
+
+    Returns:
+        set: names listed in the parameter
+    """
+    if request is None:
+        return set()
+    return {
+        value.strip()
+        for value in request.query_params.get(name, "").split(",")
+        if value.strip()
+    }
+
+
+def get_expanded(request):
+    """Return names of the fields listed in the `expand` query parameter."""
+    return get_query_list(request, "expand")
+
+
+def _get_related_plan(field, model):
+    """Return the query plan of the related model rendered by a field.
+
+    Returns None when the field does not need a join, and False when the
+    data it reads is unknown.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return None
+    if isinstance(field, serializers.SlugRelatedField):
+        return {model._meta.pk.name, field.slug_field}, [], []
+    if isinstance(field, serializers.ModelSerializer):
+        return get_query_plan(field) or False
+    return False
+
+
+def _get_relation_plan(model_field, field):
+    """Return what a relation field adds to the plan of its serializer."""
+    related_field = (
+        getattr(field, "child", None)
+        or getattr(field, "child_relation", None)
+        or field
+    )
+    model = model_field.related_model
+    plan = _get_related_plan(related_field, model)
+    if plan is False:
+        return None
+    name = model_field.name
+    if model_field.concrete and not model_field.many_to_many:
+        if plan is None:
+            return {name}, [], []
+        related_only, related_select, related_prefetch = plan
+        return (
+            {name} | {"%s__%s" % (name, path) for path in related_only},
+            [name] + ["%s__%s" % (name, path) for path in related_select],
+            [
+                Prefetch(
+                    "%s__%s" % (name, lookup.prefetch_through),
+                    queryset=lookup.queryset,
+                )
+                for lookup in related_prefetch
+            ],
+        )
+    if not (model_field.many_to_many or model_field.one_to_many):
+        return None
+    related_only, related_select, related_prefetch = (
+        plan or ({model._meta.pk.name}, [], []))
+    if model_field.one_to_many:
+        # Prefetched rows are matched to their parent by this key.
+        related_only = related_only | {model_field.field.name}
+    queryset = apply_query_plan(
+        model.objects.all(), (related_only, related_select, related_prefetch))
+    return set(), [], [Prefetch(name, queryset=queryset)]
+
+
+def get_query_plan(serializer):
+    """Return what the fields of a model serializer read from the database.
+
+    Serializers may map fields that are not model fields to the model
+    fields they read with a `field_sources` dict.
+
+    Args:
+        serializer (ModelSerializer): serializer with its final fields
+
+    Returns:
+        tuple: field names for `only()`, relations for `select_related()`
+            and `Prefetch` objects, or None when a field reads data the
+            plan cannot describe
+    """
+    opts = serializer.Meta.model._meta
+    only = {opts.pk.name}
+    only.update(
+        name.lstrip("-") for name in opts.ordering
+        if isinstance(name, str) and name != "?"
+    )
+    select, prefetch = [], []
+    sources = getattr(serializer, "field_sources", {})
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if len(field.source_attrs) != 1:
+            return None
+        name = field.source_attrs[0]
+        if name in sources:
+            only.update(sources[name])
+            continue
+        try:
+            model_field = opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.is_relation:
+            only.add(name)
+            continue
+        relation = _get_relation_plan(model_field, field)
+        if relation is None:
+            return None
+        only.update(relation[0])
+        select.extend(relation[1])
+        prefetch.extend(relation[2])
+    return only, select, prefetch
+
+
+def apply_query_plan(queryset, plan):
+    """Load only the fields and relations of a query plan."""
+    only, select, prefetch = plan
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*only)
+
+
+def narrow_queryset(queryset, serializer, only_fields=()):
+    """Narrow a queryset to the data the serializer renders.
+
+    Joins and prefetches of the queryset are replaced by the ones of the
+    serializer's query plan; the queryset is returned unchanged when no
+    plan can be made. `only_fields` are loaded whatever the serializer
+    renders.
+    """
+    plan = get_query_plan(serializer)
+    if plan is None:
+        return queryset
+    only, select, prefetch = plan
+    return apply_query_plan(
+        queryset.select_related(None).prefetch_related(None),
+        (only | set(only_fields), select, prefetch),
+    )
+
+
+class PreloadedSlugRelatedField(serializers.SlugRelatedField):
+    """Slug related field reading objects preloaded into the context.
+
+    Bulk requests put the referenced objects of every item into
+    `context["slug_objects"]` (see `api.bulk.preload_slugs`), other requests
+    fetch them from the database. With `many=True` the whole list of slugs
+    is resolved by a single query.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return SlugManyRelatedField(**list_kwargs)
+
+    def get_objects(self, slugs):
+        """Return the objects with the slugs by slug, one query at most."""
+        queryset = self.get_queryset()
+        objects = self.context.get("slug_objects", {}).get(queryset.model)
+        if objects is not None:
+            return objects
+        return {
+            getattr(obj, self.slug_field): obj
+            for obj in queryset.filter(**{"%s__in" % self.slug_field: slugs})
+        }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail("invalid")
+        try:
+            return self.get_objects([data])[data]
+        except KeyError:
+            self.fail(
+                "does_not_exist", slug_name=self.slug_field, value=data)
+
+
+class SlugManyRelatedField(serializers.ManyRelatedField):
+    """List of slugs resolved by a single query.
+
+    Every unknown slug of the list is reported in one error.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Objects with {slug_name}={value} do not exist.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        relation = self.child_relation
+        if not all(isinstance(slug, str) for slug in data):
+            relation.fail("invalid")
+        slugs = list(dict.fromkeys(data))
+        objects = relation.get_objects(slugs)
+        missing = [slug for slug in slugs if slug not in objects]
+        if missing:
+            self.fail(
+                "does_not_exist",
+                slug_name=relation.slug_field,
+                value=", ".join(missing),
+            )
+        return [objects[slug] for slug in slugs]
+
+
+class TimedRepresentationMixin:
+    """Serializer mixin adding its representation time to request timings.
+
+    Only sampled requests carry a timing, see
+    `api_yamdb.middleware.RequestTimingMiddleware`.
+    """
+
+    def to_representation(self, instance):
+        timing = getattr(self.context.get("request"), "timing", None)
+        if timing is None:
+            return super().to_representation(instance)
+        with timing.time_serialization():
+            return super().to_representation(instance)
+
+
+class DynamicFieldsMixin:
+    """Serializer mixin for sparse fieldsets and expansion.
+
+    `?fields=id,name` keeps only the listed fields of a read request, and
+    `?expand=review` renders the field with its `expandable_fields`
+    serializer. Only the top-level serializer of the view follows the
+    parameters, nested serializers render all of their fields.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        for name in get_expanded(request) & set(self.expandable_fields):
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        kept = get_query_list(request, "fields")
+        if kept and request.method in SAFE_METHODS:
+            for name in set(self.fields) - kept:
+                self.fields.pop(name)
+
+
+class CategorySerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """Category serializer."""
 
     class Meta:
         model = Category
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
         extra_kwargs = {
             'url': {'lookup_field': 'slug'}
         }
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """Genre serializer."""
 
     class Meta:
         model = Genre
-        exclude = ('id',)
+        exclude = ('id', 'updated_at')
         extra_kwargs = {
             'url': {'lookup_field': 'slug'}
         }
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleReadSerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """Title read serializer."""
 
     category = CategorySerializer(read_only=True)
@@ -40,30 +309,44 @@ class TitleReadSerializer(serializers.ModelSerializer):
     )
     rating = serializers.IntegerField(read_only=True)
 
+    field_sources = {'rating': ('score_sum', 'review_count')}
+
     class Meta:
-        fields = '__all__'
+        exclude = ('score_sum', 'review_count', 'updated_at')
         model = Title
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Title write serializer."""
 
-    category = serializers.SlugRelatedField(
+    category = PreloadedSlugRelatedField(
         queryset=Category.objects.all(),
         slug_field='slug'
     )
-    genre = serializers.SlugRelatedField(
+    genre = PreloadedSlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
         many=True
     )
 
     class Meta:
-        fields = '__all__'
+        exclude = ('score_sum', 'review_count', 'updated_at')
         model = Title
 
-
-class UserSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        # The genres of a new title are inserted by a single query.
+        genres = validated_data.pop('genre', [])
+        title = Title.objects.create(**validated_data)
+        Title.genre.through.objects.bulk_create([
+            Title.genre.through(title=title, genre=genre)
+            for genre in genres
+        ])
+        return title
+
+
+class UserSerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """User serializer."""
 
     class Meta:
@@ -76,6 +359,11 @@ class UserSerializer(serializers.ModelSerializer):
             "bio",
             "role"
         )
+        # Emails are unique regardless of case, see users.models.User.
+        extra_kwargs = {
+            "email": {"validators": [UniqueValidator(
+                queryset=User.objects.all(), lookup="iexact")]},
+        }
 
     def validate(self, attrs):
         if self.context.get("request").method != "PATCH":
@@ -87,7 +375,9 @@ class UserSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     """Review serializer."""
 
     title = serializers.SlugRelatedField(
@@ -99,30 +389,36 @@ class ReviewSerializer(serializers.ModelSerializer):
         default=serializers.CurrentUserDefault(), read_only=True
     )
 
-    def validate(self, data):
-        request = self.context["request"]
-        author = request.user
-        title_id = self.context["view"].kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == "POST":
-            if Review.objects.filter(title=title, author=author).exists():
-                raise serializers.ValidationError(
-                    "На одно произведение вы можете оставить только один отзыв"
-                )
-        return data
+    def create(self, validated_data):
+        # The "unique review" constraint rejects a second review of the
+        # author, the savepoint keeps the request transaction usable.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                "На одно произведение вы можете оставить только один отзыв"
+            )
 
     class Meta:
         model = Review
-        fields = "__all__"
+        exclude = ("updated_at",)
+
 
+class CommentSerializer(
+    TimedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
+    """Comment serializer.
 
-class CommentSerializer(serializers.ModelSerializer):
-    """Comment serializer."""
+    The review is rendered as its id, `?expand=review` embeds the whole
+    review instead."""
 
-    review = serializers.SlugRelatedField(slug_field="text", read_only=True)
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
     author = serializers.SlugRelatedField(
         slug_field="username", read_only=True)
 
+    expandable_fields = {"review": ReviewSerializer}
+
     class Meta:
         model = Comment
         fields = "__all__"
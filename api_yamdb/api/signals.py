@@ -0,0 +1,28 @@
+"""Signal handlers invalidating cached API responses and users."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import Category, Genre
+from users.models import User
+
+from .authentication import user_cache
+from .cache import bump_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_cached_lists(sender, **kwargs):
+    """Drop cached category and genre lists after any write."""
+    bump_version(sender._meta.label_lower)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    """Make the next request of the user load it from the database."""
+    user_cache.delete(getattr(instance, api_settings.USER_ID_FIELD))
@@ -1,10 +1,9 @@
 """Application view classes."""
 
-import re
-
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import EmailMessage
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, status, viewsets
@@ -14,12 +13,16 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import AccessToken
 from api_yamdb.settings import SENDER
-from reviews.models import Category, Genre, Review, Title
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.mail import queue_mail
 from users.models import User
 
 
 from .filters import TitleFilter
-from .mixins import CreateListDestroyViewSet
+from .mixins import (BulkWriteMixin, ConditionalGetMixin,
+                     CreateListDestroyViewSet, NarrowQuerySetMixin,
+                     VersionedListCacheMixin)
+from .pagination import OptionalCursorPagination
 from .permissons import (AdminOnly, AuthorModeratorAdminOrReadOnly,
                          IsAdminSuperuserOrReadOnly)
 from .serializers import (CategorySerializer, CommentSerializer,
@@ -29,7 +32,12 @@ from .serializers import (CategorySerializer, CommentSerializer,
                           UserSerializer)
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(
+    VersionedListCacheMixin,
+    NarrowQuerySetMixin,
+    BulkWriteMixin,
+    CreateListDestroyViewSet,
+):
     """Category viewset"""
 
     queryset = Category.objects.all()
@@ -40,7 +48,12 @@ class CategoryViewSet(CreateListDestroyViewSet):
     lookup_field = "slug"
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(
+    VersionedListCacheMixin,
+    NarrowQuerySetMixin,
+    BulkWriteMixin,
+    CreateListDestroyViewSet,
+):
     """Genre viewset"""
 
     queryset = Genre.objects.all()
@@ -51,21 +64,31 @@ class GenreViewSet(CreateListDestroyViewSet):
     lookup_field = "slug"
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalGetMixin,
+    NarrowQuerySetMixin,
+    BulkWriteMixin,
+    viewsets.ModelViewSet,
+):
     """Title viewset"""
 
-    queryset = Title.objects.annotate(rating=Avg("reviews__score")).all()
+    queryset = Title.objects.all()
     filter_backends = (DjangoFilterBackend,)
     permission_classes = [IsAdminSuperuserOrReadOnly]
     filterset_class = TitleFilter
 
+    def get_queryset(self):
+        if self.action in ["list", "retrieve"]:
+            return Title.objects.for_read()
+        return super().get_queryset()
+
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
             return TitleReadSerializer
         return TitleWriteSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(NarrowQuerySetMixin, viewsets.ModelViewSet):
     """User viewset"""
 
     queryset = User.objects.all()
@@ -95,34 +118,76 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ConditionalGetMixin, NarrowQuerySetMixin, viewsets.ModelViewSet
+):
     """Review viewset"""
 
     serializer_class = ReviewSerializer
     permission_classes = [AuthorModeratorAdminOrReadOnly]
+    pagination_class = OptionalCursorPagination
+    # Reviews render the title name, and deleted reviews touch the title.
+    # Renamed authors touch their reviews, see reviews.signals.
+    modified_fields = ("updated_at", "title__updated_at")
+    list_last_modified = True
+    # Lists come from the title's related manager, which reads the title
+    # id of every row.
+    narrowed_only_fields = ("title",)
+
+    def get_title(self):
+        """Return the title of the url, fetched once per request."""
+        if not hasattr(self, "_title"):
+            self._title = get_object_or_404(
+                Title, pk=self.kwargs.get("title_id"))
+        return self._title
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        return title.reviews.all()
+        fields = ("text", "score", "pub_date", "title", "author__username")
+        if self.action == "list":
+            return self.get_title().reviews.select_related(
+                "author").only(*fields)
+        # A missing title or review is a 404 of the same single query.
+        queryset = Review.objects.filter(
+            title_id=self.kwargs.get("title_id")
+        ).select_related("author", "title")
+        if self.action == "retrieve":
+            return queryset.only(*fields, "title__name")
+        # save() writes only the loaded fields, and updates must move the
+        # auto_now updated_at that conditional requests compare.
+        return queryset
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-        serializer.save(author=self.request.user, title=title)
+        serializer.save(author=self.request.user, title=self.get_title())
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(NarrowQuerySetMixin, viewsets.ModelViewSet):
     """Comment vieset"""
 
     serializer_class = CommentSerializer
     permission_classes = [AuthorModeratorAdminOrReadOnly]
+    pagination_class = OptionalCursorPagination
+    # Lists come from the review's related manager, which reads the review
+    # id of every row.
+    narrowed_only_fields = ("review",)
+
+    def get_review(self):
+        """Return the review of the url, fetched once per request."""
+        if not hasattr(self, "_review"):
+            self._review = get_object_or_404(
+                Review, pk=self.kwargs.get("review_id"))
+        return self._review
 
     def get_queryset(self):
-        review = get_object_or_404(Review, pk=self.kwargs.get("review_id"))
-        return review.comments.all()
+        fields = ("text", "pub_date", "review", "author__username")
+        if self.action == "list":
+            return self.get_review().comments.select_related(
+                "author").only(*fields)
+        return Comment.objects.filter(
+            review_id=self.kwargs.get("review_id")
+        ).select_related("author").only(*fields)
 
     def perform_create(self, serializer):
-        review = get_object_or_404(Review, id=self.kwargs.get("review_id"))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
 
 
 class APIUserCreate(APIView):
@@ -139,53 +204,53 @@ class APIUserCreate(APIView):
     def create_conf_code_send_mail(self, user, data):
 
         confirmation_code = default_token_generator.make_token(user)
-        email = EmailMessage(
+        queue_mail(
             subject=data["subject"],
             body=(f"Ваш код доступа к API: {confirmation_code}"),
             from_email=data["from_email"],
             to=data["to_email"],
         )
-        email.send()
 
     def post(self, request):
         serializer = UserCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         username = serializer.validated_data.get("username")
         email = serializer.validated_data.get("email")
-        if not re.fullmatch((r"^[\w.@+-]+\Z"), username):
-            return Response(
-                {"username": "Not valid username.",
-                 "email": "Not valid email"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        if User.objects.filter(username=username, email=email).exists():
-            user = User.objects.get(username=username, email=email)
-            data = {
-                "subject": "Ваш код доступа",
-                "from_email": SENDER,
-                "to_email": [email],
-            }
-            self.create_conf_code_send_mail(user, data)
+        # A single query finds the owners of both the username and the
+        # email, served by their unique indexes.
+        owners = list(
+            User.objects.annotate(email_lower=Lower("email")).filter(
+                Q(username=username) | Q(email_lower=email.lower())
+            )[:2]
+        )
+        if not owners:
+            try:
+                with transaction.atomic():
+                    user = serializer.save()
+            except IntegrityError:
+                # Another request took the username or the email meanwhile.
+                return Response(
+                    {"username": "Username or email is already taken."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        elif len(owners) == 1 and owners[0].username == username and (
+                owners[0].email.lower() == email.lower()):
+            user = owners[0]
+        else:
             return Response(
-                {"username": username, "email": email},
-                status=status.HTTP_200_OK,
+                {"username": "Username or email is already taken."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        elif User.objects.filter(email=email).exists():
-            return Response(serializer.errors,
-                            status=status.HTTP_400_BAD_REQUEST)
-        elif User.objects.filter(username=username).exists():
-            if User.objects.get(username=username).email != email:
-                return Response(serializer.errors,
-                                status=status.HTTP_400_BAD_REQUEST)
-        else:
-            user = serializer.save()
-            data = {
-                "subject": "Ваш код доступа",
-                "from_email": SENDER,
-                "to_email": [email]
-            }
-            self.create_conf_code_send_mail(user, data)
-            return Response(request.data, status=status.HTTP_200_OK)
+        data = {
+            "subject": "Ваш код доступа",
+            "from_email": SENDER,
+            "to_email": [user.email],
+        }
+        self.create_conf_code_send_mail(user, data)
+        return Response(
+            {"username": username, "email": email},
+            status=status.HTTP_200_OK,
+        )
 
 
 class TokenView(generics.CreateAPIView):
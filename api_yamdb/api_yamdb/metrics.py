@@ -0,0 +1,176 @@
+"""Prometheus metrics aggregated across worker processes.
+
+Every worker process counts in its own memory and periodically writes the
+totals to its own file of `METRICS_DIR`, so the hot path takes no lock
+shared with other workers. The `/metrics` view sums the files of all
+workers, files of stopped workers included, which keeps counters
+monotonic across worker restarts.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse
+
+COUNTERS = {
+    "yamdb_http_requests_total": "Number of served requests.",
+}
+
+HISTOGRAMS = {
+    "yamdb_http_request_duration_seconds": (
+        "Time spent serving requests.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "yamdb_http_response_size_bytes": (
+        "Size of response bodies.",
+        (100, 1000, 10000, 100000, 1000000),
+    ),
+    "yamdb_db_queries": (
+        "Number of database queries per request.",
+        (0, 1, 2, 5, 10, 20, 50, 100),
+    ),
+}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class WorkerMetrics:
+    """Counters and histograms of the current worker process."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.filename = "worker-%d-%s.json" % (self.pid, uuid.uuid4().hex)
+        self.counters = {}
+        self.histograms = {}
+        self.flushed = time.monotonic()
+        # Only threads of this worker may wait for it.
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = json.dumps(labels, sort_keys=True)
+        with self.lock:
+            values = self.counters.setdefault(name, {})
+            values[key] = values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """Add a value to a histogram, stored as per bucket counts."""
+        buckets = HISTOGRAMS[name][1]
+        key = json.dumps(labels, sort_keys=True)
+        with self.lock:
+            values = self.histograms.setdefault(name, {})
+            # Per bucket counts, then the sum and the count.
+            data = values.setdefault(key, [0] * (len(buckets) + 3))
+            data[bisect_left(buckets, value)] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def flush(self, force=False):
+        """Write the totals to the worker's file at most every interval."""
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self.flushed = now
+        with self.lock:
+            data = json.dumps({
+                "counters": self.counters,
+                "histograms": self.histograms,
+            })
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, self.filename)
+        with open(path + ".tmp", "w") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the metrics of the current process.
+
+    A process forked after the metrics were created starts its own ones.
+    """
+    global _metrics
+    if _metrics is None or _metrics.pid != os.getpid():
+        with _metrics_lock:
+            if _metrics is None or _metrics.pid != os.getpid():
+                _metrics = WorkerMetrics()
+                atexit.register(_metrics.flush, force=True)
+    return _metrics
+
+
+def collect():
+    """Sum the files of every worker.
+
+    Returns:
+        tuple: counters and histograms by name and labels
+    """
+    counters, histograms = {}, {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, values in data["counters"].items():
+            totals = counters.setdefault(name, {})
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0) + value
+        for name, values in data["histograms"].items():
+            totals = histograms.setdefault(name, {})
+            for key, value in values.items():
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], value)]
+                else:
+                    totals[key] = value
+    return counters, histograms
+
+
+def _format_labels(key, **extra):
+    labels = dict(json.loads(key), **extra)
+    return "{%s}" % ",".join(
+        '%s="%s"' % (
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in sorted(labels.items())
+    )
+
+
+def render(counters, histograms):
+    """Format metrics in the Prometheus text format."""
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s counter" % name)
+        for key, value in sorted(counters.get(name, {}).items()):
+            lines.append("%s%s %s" % (name, _format_labels(key), value))
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append("# HELP %s %s" % (name, help_text))
+        lines.append("# TYPE %s histogram" % name)
+        for key, data in sorted(histograms.get(name, {}).items()):
+            cumulative = 0
+            for bound, count in zip(
+                    [*map(str, buckets), "+Inf"], data[:-2]):
+                cumulative += count
+                lines.append("%s_bucket%s %d" % (
+                    name, _format_labels(key, le=bound), cumulative))
+            lines.append("%s_sum%s %s" % (name, _format_labels(key), data[-2]))
+            lines.append("%s_count%s %d" % (
+                name, _format_labels(key), data[-1]))
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """Expose the metrics of all workers to Prometheus."""
+    get_metrics().flush(force=True)
+    return HttpResponse(render(*collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,197 @@
+"""Project middleware."""
+
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import get_metrics
+
+logger = logging.getLogger("api_yamdb.timing")
+
+# "View.action" serving the current request, for database instrumentation.
+current_view = ContextVar("current_view", default=None)
+
+
+def describe_view(request, view_func):
+    """Return the name and the action of the view serving the request."""
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return view_func.__qualname__, None
+    actions = getattr(view_func, "actions", None) or {}
+    method = request.method.lower()
+    return view_class.__name__, actions.get(method, method)
+
+
+class RequestTiming:
+    """Database, view, serialization and render timings of a request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_finished = None
+        self.render_finished = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.view = None
+        self.action = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count and time a query, see `connection.execute_wrapper()`."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    @contextmanager
+    def time_serialization(self):
+        """Time a representation, nested ones are counted once."""
+        if self.serializing:
+            yield
+            return
+        self.serializing = True
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.serialize_time += time.perf_counter() - started
+            self.serializing = False
+
+    def finish_view(self, response):
+        self.view_finished = time.perf_counter()
+        response.add_post_render_callback(self.finish_render)
+
+    def finish_render(self, response):
+        self.render_finished = time.perf_counter()
+
+    def get_durations(self):
+        """Return the timings in milliseconds."""
+        finished = time.perf_counter()
+        view_finished = self.view_finished or finished
+        durations = {
+            "db": self.db_time,
+            "view": view_finished - self.started,
+            "serialize": self.serialize_time,
+            "render": (
+                (self.render_finished or view_finished) - view_finished),
+            "total": finished - self.started,
+        }
+        return {
+            name: round(seconds * 1000, 3)
+            for name, seconds in durations.items()
+        }
+
+
+class RequestTimingMiddleware:
+    """Report database, view, serialization and render time of requests.
+
+    `REQUEST_TIMING_SAMPLE_RATE` of the requests get a `Server-Timing`
+    header and a JSON line in the `api_yamdb.timing` log, tagged with the
+    DRF view and action. The serialization time is the part of the view
+    time spent in the `to_representation()` of the API serializers, see
+    `api.serializers.TimedRepresentationMixin`; the render time is the work
+    of the renderer. With a zero rate the middleware is left out of the
+    chain.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing = request.timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        durations = timing.get_durations()
+        response["Server-Timing"] = ", ".join(
+            '%s;dur=%s%s' % (
+                name,
+                duration,
+                ';desc="%d queries"' % timing.queries if name == "db" else "",
+            )
+            for name, duration in durations.items()
+        )
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "view": timing.view,
+            "action": timing.action,
+            "queries": timing.queries,
+            **{"%s_ms" % name: value for name, value in durations.items()},
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            timing.view, timing.action = describe_view(request, view_func)
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            timing.finish_view(response)
+        return response
+
+
+class MetricsMiddleware:
+    """Count requests, their latency, size and queries for `/metrics`.
+
+    Requests not resolved to a view are labelled as "unmatched", so that
+    scanned URLs do not multiply the series.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.metrics_timing = RequestTiming()
+        timing.view = "unmatched"
+        token = current_view.set(None)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            current_view.reset(token)
+        labels = {"view": timing.view, "action": timing.action or ""}
+        metrics = get_metrics()
+        metrics.inc("yamdb_http_requests_total", {
+            **labels,
+            "method": request.method,
+            "status": str(response.status_code),
+        })
+        metrics.observe(
+            "yamdb_http_request_duration_seconds",
+            labels,
+            time.perf_counter() - timing.started,
+        )
+        if not response.streaming:
+            metrics.observe(
+                "yamdb_http_response_size_bytes", labels,
+                len(response.content))
+        metrics.observe("yamdb_db_queries", labels, timing.queries)
+        metrics.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view, action = describe_view(request, view_func)
+        request.metrics_timing.view = view
+        request.metrics_timing.action = action
+        current_view.set("%s.%s" % (view, action) if action else view)
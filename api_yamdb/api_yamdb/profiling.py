@@ -0,0 +1,157 @@
+"""Profiling of single requests on demand.
+
+A request carrying the `X-Profile` header or the `profile` query parameter
+runs under cProfile when it is authenticated as an admin listed in
+`PROFILING_USERS`. The profile and the SQL of the request are saved to
+`PROFILING_DIR`, which keeps the latest `PROFILING_KEEP` profiles, and are
+read by the `profiles` management command.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api.permissons import AdminOnly
+
+HEADER = "HTTP_X_PROFILE"
+QUERY_PARAMETER = "profile"
+RESPONSE_HEADER = "X-Profile-Id"
+
+
+class QueryLog:
+    """SQL and duration of the queries of a request."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        """Record a query, see `connection.execute_wrapper()`."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "alias": context["connection"].alias,
+                "sql": sql,
+                "params": str(params),
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+def get_profile_path(profile_id, extension):
+    return os.path.join(
+        settings.PROFILING_DIR, "%s.%s" % (profile_id, extension))
+
+
+def list_profiles():
+    """Return the metadata of the saved profiles, the latest first."""
+    profiles = []
+    paths = glob.glob(os.path.join(settings.PROFILING_DIR, "*.json"))
+    for path in sorted(paths, reverse=True):
+        try:
+            with open(path) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def rotate():
+    """Delete the profiles beyond the latest `PROFILING_KEEP` ones."""
+    paths = glob.glob(os.path.join(settings.PROFILING_DIR, "*.json"))
+    for path in sorted(paths, reverse=True)[settings.PROFILING_KEEP:]:
+        profile_id = os.path.splitext(os.path.basename(path))[0]
+        for extension in ("prof", "json"):
+            try:
+                os.remove(get_profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def get_allowed_user(request):
+    """Return the allowed admin the request is authenticated as, if any.
+
+    The middleware runs before DRF, so the request is authenticated here
+    with the authentication classes of the API.
+    """
+    drf_request = Request(request, authenticators=[
+        authentication()
+        for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        user = drf_request.user
+    except APIException:
+        return None
+    if (user.is_authenticated
+            and user.username in settings.PROFILING_USERS
+            and AdminOnly().has_permission(drf_request, None)):
+        return user
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile the requests asking for it, see the module docstring.
+
+    The id of the saved profile is returned in the `X-Profile-Id` header.
+    Without allowed users the middleware is left out of the chain.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.PROFILING_USERS:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if HEADER not in request.META and QUERY_PARAMETER not in request.GET:
+            return self.get_response(request)
+        user = get_allowed_user(request)
+        if user is None:
+            return self.get_response(request)
+        query_log = QueryLog()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+            profile.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profile.disable()
+        duration = time.perf_counter() - started
+        response[RESPONSE_HEADER] = self.save(
+            request, user, response, profile, query_log, duration)
+        return response
+
+    @staticmethod
+    def save(request, user, response, profile, query_log, duration):
+        now = timezone.now()
+        profile_id = "%s-%s" % (
+            now.strftime("%Y%m%d-%H%M%S%f"), uuid.uuid4().hex[:8])
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        profile.dump_stats(get_profile_path(profile_id, "prof"))
+        with open(get_profile_path(profile_id, "json"), "w") as f:
+            json.dump({
+                "id": profile_id,
+                "created": now.isoformat(),
+                "method": request.method,
+                "path": request.get_full_path(),
+                "user": user.username,
+                "status": response.status_code,
+                "ms": round(duration * 1000, 3),
+                "queries": query_log.queries,
+            }, f, ensure_ascii=False, indent=2)
+        rotate()
+        return profile_id
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 
@@ -8,7 +9,10 @@ SECRET_KEY = 'p&l%385148kslhtyn^##a1)ilz@4zqj=rq&agdol^##zgl9(vs'
 
 DEBUG = False
 
-ALLOWED_HOSTS = ['51.250.109.198', 'localhost', '127.0.0.1']
+# `web` is the host of the scrapes of /metrics from the compose network.
+ALLOWED_HOSTS = os.getenv(
+    'ALLOWED_HOSTS', default='51.250.109.198,localhost,127.0.0.1,web'
+).split(',')
 
 
 INSTALLED_APPS = [
@@ -26,6 +30,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_yamdb.profiling.ProfilingMiddleware',
+    'api_yamdb.middleware.MetricsMiddleware',
+    'api_yamdb.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +42,43 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Share of requests reporting their SQL and timings, 0 turns it off.
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_TIMING_SAMPLE_RATE', default='0'))
+
+# Every worker process writes its metrics here at most every interval,
+# in seconds. The directory is shared by the workers of one host.
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'api_yamdb_metrics'))
+METRICS_FLUSH_INTERVAL = float(
+    os.getenv('METRICS_FLUSH_INTERVAL', default='5'))
+
+# Admins allowed to profile requests with the X-Profile header or the
+# profile query parameter, see api_yamdb.profiling. Empty turns it off.
+PROFILING_USERS = [
+    username for username in os.getenv(
+        'PROFILING_USERS', default='').split(',')
+    if username
+]
+PROFILING_DIR = os.getenv(
+    'PROFILING_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'api_yamdb_profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', default='50'))
+
+# Queries slower than the threshold are logged to SLOW_QUERY_DIR with their
+# plan, see api_yamdb.slowqueries. The log is not rotated, so it is off
+# unless a threshold is set for an investigation, e.g. 100.
+SLOW_QUERY_THRESHOLD_MS = os.getenv('SLOW_QUERY_THRESHOLD_MS', default='')
+SLOW_QUERY_THRESHOLD_MS = (
+    float(SLOW_QUERY_THRESHOLD_MS) if SLOW_QUERY_THRESHOLD_MS else None)
+SLOW_QUERY_DIR = os.getenv(
+    'SLOW_QUERY_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'api_yamdb_slow_queries'))
+# EXPLAIN ANALYZE runs the slow query once more, PostgreSQL only.
+SLOW_QUERY_EXPLAIN_ANALYZE = (
+    os.getenv('SLOW_QUERY_EXPLAIN_ANALYZE', default='') == 'True')
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
@@ -68,6 +112,18 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='api_yamdb'),
+    }
+}
+
+LIST_CACHE_TIMEOUT = 300
+
+# Largest number of objects accepted by a single bulk/ request.
+BULK_MAX_ITEMS = 1000
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,7 +165,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -119,6 +175,10 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
 }
 
+# Authenticated users are kept in the memory of every worker process.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
@@ -128,3 +188,23 @@ SIMPLE_JWT = {
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 SENDER = 'from@example.com'
+
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+
+MAIL_QUEUE_RETRY_DELAY = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api_yamdb.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -0,0 +1,153 @@
+"""Log of slow database queries.
+
+Every new connection gets `record_slow_queries` as an execute wrapper.
+Queries slower than `SLOW_QUERY_THRESHOLD_MS` are appended to
+`queries.jsonl` of `SLOW_QUERY_DIR` with their fingerprint, the hash of
+the SQL without literals, and the view that ran them. The first slow
+SELECT of every fingerprint is explained into `plans/<fingerprint>.json`,
+with `EXPLAIN ANALYZE` on PostgreSQL when `SLOW_QUERY_EXPLAIN_ANALYZE` is
+set. The `slowqueries` management command aggregates the log.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .middleware import current_view
+
+LITERALS = re.compile(
+    r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?", re.IGNORECASE)
+LISTS = re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+SPACES = re.compile(r"\s+")
+EXPLAINABLE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+_local = threading.local()
+_explained = set()
+
+
+def normalize(sql):
+    """Replace literals and parameters with `?`, IN lists with `(...)`."""
+    sql = LITERALS.sub("?", SPACES.sub(" ", sql).strip())
+    return LISTS.sub("IN (...)", sql)
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:16]
+
+
+def get_log_path():
+    return os.path.join(settings.SLOW_QUERY_DIR, "queries.jsonl")
+
+
+def get_plan_path(query_fingerprint):
+    return os.path.join(
+        settings.SLOW_QUERY_DIR, "plans", "%s.json" % query_fingerprint)
+
+
+def explain(connection, sql, params):
+    """Return the plan of a query, executing it for EXPLAIN ANALYZE."""
+    analyze = (
+        connection.vendor == "postgresql"
+        and settings.SLOW_QUERY_EXPLAIN_ANALYZE
+    )
+    options = {"analyze": True} if analyze else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    # A failing EXPLAIN must not break the transaction of the request.
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute("%s %s" % (prefix, sql), params)
+            rows = cursor.fetchall()
+    return analyze, "\n".join(
+        str(row[0]) if len(row) == 1 else " ".join(map(str, row))
+        for row in rows
+    )
+
+
+def save_plan(connection, query_fingerprint, sql, params):
+    """Explain the first slow SELECT of a fingerprint.
+
+    The plan file is created exclusively, so that concurrent workers keep
+    a single plan.
+    """
+    _explained.add(query_fingerprint)
+    path = get_plan_path(query_fingerprint)
+    if (os.path.exists(path)
+            or not EXPLAINABLE.match(sql)
+            or not connection.features.supports_explaining_query_execution):
+        return
+    try:
+        analyze, plan = explain(connection, sql, params)
+    except DatabaseError:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path, "x") as f:
+            json.dump({
+                "fingerprint": query_fingerprint,
+                "vendor": connection.vendor,
+                "sql": sql,
+                "params": str(params),
+                "analyze": analyze,
+                "plan": plan,
+            }, f, ensure_ascii=False, indent=2)
+    except FileExistsError:
+        pass
+
+
+def record(connection, sql, params, many, duration):
+    normalized_sql = normalize(sql)
+    query_fingerprint = fingerprint(normalized_sql)
+    os.makedirs(settings.SLOW_QUERY_DIR, exist_ok=True)
+    line = json.dumps({
+        "fingerprint": query_fingerprint,
+        "sql": normalized_sql,
+        "ms": round(duration * 1000, 3),
+        "view": current_view.get(),
+        "alias": connection.alias,
+        "time": timezone.now().isoformat(),
+    }, ensure_ascii=False)
+    # A single short append is not interleaved with other workers.
+    with open(get_log_path(), "a") as f:
+        f.write(line + "\n")
+    if not many and query_fingerprint not in _explained:
+        save_plan(connection, query_fingerprint, sql, params)
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    """Time a query, see `connection.execute_wrapper()`.
+
+    Queries run while recording, EXPLAIN included, are not recorded.
+    """
+    if getattr(_local, "recording", False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is not None and duration * 1000 >= threshold:
+        _local.recording = True
+        try:
+            record(context["connection"], sql, params, many, duration)
+        finally:
+            _local.recording = False
+    return result
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    """Add the outermost wrapper, once for every reconnection.
+
+    Wrappers of `connection.execute_wrapper()` blocks are popped from the
+    end of the list, which must stay theirs.
+    """
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow_queries)
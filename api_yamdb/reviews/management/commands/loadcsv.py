@@ -1,101 +1,115 @@
 """Custom manage.py command for loading csv files into project database."""
-import csv
+import time
 
+from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, IntegrityError
 
-from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
-from users.models import User
+from api.cache import bump_version
+from reviews.management.csvloader import (TABLES, load_csv, load_directory,
+                                          reset_sequences)
 
-COMMANDS = {
-    "category": Category,
-    "comments": Comment,
-    "genre": Genre,
-    "genre_title": GenreTitle,
-    "review": Review,
-    "titles": Title,
-    "users": User,
-}
+# Malformed files and values the columns do not accept.
+DATA_ERRORS = (ValueError, ValidationError, DataError, IntegrityError)
 
 
 class Command(BaseCommand):
     help = (
         "The command for loading csv files into projects db."
         " Takes command-line arguments. For example to load"
-        "file genre.csv you need to enter the following command:"
+        " file review.csv you need to enter the following command:"
         " python manage.py loadcsv review"
         " /home/kubanez/Dev/api_yamdb/api_yamdb/static/data/review.csv."
         " Also you need to load files in order:\n"
         "first - files with models without foreign keys ( genre"
-        " category, user, title)\n"
-        "then - models with them ( titles, genre_title, review and comment)"
+        " category, user)\n"
+        "then - models with them ( titles, genre_title, review and comment)."
+        " Rows referring to missing objects are skipped. PostgreSQL"
+        " databases are loaded with COPY, other ones with batched"
+        " inserts.\n"
+        "To load every file of a directory in the right order at once"
+        " enter: python manage.py loadcsv --all"
+        " /home/kubanez/Dev/api_yamdb/api_yamdb/static/data"
     )
 
     def add_arguments(self, parser):
         # Positional arguments
-        parser.add_argument("command", nargs="+", type=str)
-        parser.add_argument("filename", nargs="+", type=str)
+        parser.add_argument("command", nargs="?", type=str,
+                            choices=sorted(TABLES))
+        parser.add_argument("filename", nargs="?", type=str)
+        parser.add_argument(
+            "--all",
+            dest="directory",
+            help="Load every <table>.csv file of the directory.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes loading independent tables.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows inserted by a single query on databases"
+                 " without COPY support.",
+        )
 
     def handle(self, *args, **options):
-        command: str = options["command"][0]
-        filename: str = options["filename"][0]
+        if options["directory"]:
+            results = self.load_directory(options)
+        elif options["command"] and options["filename"]:
+            results = [self.load_file(options)]
+        else:
+            raise CommandError(
+                "Enter a table and a csv file or --all with a directory")
 
-        try:
-            model = COMMANDS.get(command)
-            with open(filename) as f:
-                reader = csv.reader(f)
-                field_names = next(reader)
-
-                for row in reader:
-                    data_to_insert = dict(zip(field_names, row))
-                    special_models = [
-                        "titles", "genre_title", "review", "comments"]
-                    if command not in special_models:
-                        model.objects.create(**data_to_insert)
-                    elif command == "titles":
-                        model.objects.create(
-                            id=data_to_insert.get("id"),
-                            name=data_to_insert.get("name"),
-                            year=data_to_insert.get("year"),
-                            category=Category.objects.get(
-                                pk=data_to_insert.get("category")
-                            ),
-                        )
-                    elif command == "genre_title":
-                        model.objects.create(
-                            id=data_to_insert.get("id"),
-                            title_id=Title.objects.get(
-                                pk=data_to_insert.get("title_id")
-                            ),
-                            genre_id=Genre.objects.get(
-                                pk=data_to_insert.get("genre_id")
-                            ),
-                        )
-                    elif command == "review":
-                        model.objects.create(
-                            id=data_to_insert.get("id"),
-                            title_id=Title.objects.get(
-                                id=data_to_insert.get("title_id")
-                            ),
-                            text=data_to_insert.get("text"),
-                            author=User.objects.get(
-                                pk=data_to_insert.get("author")),
-                            score=data_to_insert.get("score"),
-                            pub_date=data_to_insert.get("pub_date"),
-                        )
-                    elif command == "comments":
-                        model.objects.create(
-                            id=data_to_insert.get("id"),
-                            review_id=Review.objects.get(
-                                id=data_to_insert.get("review_id")
-                            ),
-                            text=data_to_insert.get("text"),
-                            author=User.objects.get(
-                                pk=data_to_insert.get("author")),
-                            pub_date=data_to_insert.get("pub_date"),
-                        )
+        for result in results:
+            bump_version(result.model._meta.label_lower)
+            if result.skipped:
+                self.stdout.write(
+                    self.style.WARNING(
+                        'Skipped %d rows of the file "%s" referring to'
+                        " missing objects" % (result.skipped, result.filename)
+                    )
+                )
             self.stdout.write(
                 self.style.SUCCESS(
-                    'Successfully loaded the file "%s"' % filename)
+                    'Successfully loaded %d rows from the file "%s"'
+                    " in %.2f s (%.0f rows/s)"
+                    % (result.loaded, result.filename, result.elapsed,
+                       result.rate)
+                )
             )
+
+    def load_file(self, options):
+        filename: str = options["filename"]
+        try:
+            result = load_csv(
+                TABLES[options["command"]], filename, options["batch_size"])
         except IOError:
             raise CommandError("File '%s' does not exist" % filename)
+        except DATA_ERRORS as error:
+            raise CommandError(error)
+        reset_sequences(result.model)
+        return result
+
+    def load_directory(self, options):
+        directory: str = options["directory"]
+        started = time.monotonic()
+        try:
+            results = load_directory(
+                directory, options["batch_size"], options["workers"])
+        except DATA_ERRORS as error:
+            raise CommandError(error)
+        if not results:
+            raise CommandError(
+                "Directory '%s' has no table csv files" % directory)
+        elapsed = time.monotonic() - started
+        loaded = sum(result.loaded for result in results)
+        self.stdout.write(
+            "Loaded %d rows from %d files in %.2f s (%.0f rows/s)"
+            % (loaded, len(results), elapsed,
+               loaded / elapsed if elapsed else loaded)
+        )
+        return results
@@ -0,0 +1,57 @@
+"""Custom manage.py command for repairing stored title ratings."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the score sum and review count stored on every title"
+        " with the title's reviews and rewrites the totals that drifted."
+        " Use --check to only report drifted titles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Report drifted titles without changing them.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of titles repaired with a single UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size: int = options["batch_size"]
+        drifted = list(
+            Title.objects.with_actual_ratings()
+            .exclude(score_sum=F("actual_score_sum"),
+                     review_count=F("actual_review_count"))
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All title ratings are ok"))
+            return
+        if options["check"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "%d titles have drifted ratings: %s"
+                    % (len(drifted), ", ".join(map(str, drifted)))
+                )
+            )
+            return
+        repaired = 0
+        with transaction.atomic():
+            for start in range(0, len(drifted), batch_size):
+                repaired += Title.objects.filter(
+                    pk__in=drifted[start:start + batch_size]
+                ).refresh_ratings()
+        self.stdout.write(
+            self.style.SUCCESS("Repaired ratings of %d titles" % repaired)
+        )
@@ -0,0 +1,373 @@
+"""Bulk loading of csv dumps into the project database."""
+import csv
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from reviews import search
+from reviews.management.workers import setup_worker
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+TABLES = {
+    "category": Category,
+    "comments": Comment,
+    "genre": Genre,
+    "genre_title": Title.genre.through,
+    "review": Review,
+    "titles": Title,
+    "users": User,
+}
+
+
+class LoadResult:
+    """Numbers of rows loaded and skipped from a single csv file."""
+
+    def __init__(self, model, filename):
+        # Results are sent back from worker processes, and auto-created
+        # through models cannot be pickled, so only the label is kept.
+        self.model_label = model._meta.label
+        self.filename = filename
+        self.loaded = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.title_ids = set()
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def rate(self):
+        return self.loaded / self.elapsed if self.elapsed else self.loaded
+
+
+def get_model_field(model, column):
+    """Return the model field stored in a csv column.
+
+    Columns are named either after the field (`author`) or after its
+    database attribute (`title_id`).
+    """
+    for field in model._meta.concrete_fields:
+        if column in (field.name, field.attname):
+            return field
+    raise ValueError(
+        "Column '%s' does not match any field of %s"
+        % (column, model._meta.label)
+    )
+
+
+@contextmanager
+def keep_auto_now(fields):
+    """Store dates from the csv instead of overwriting them with now()."""
+    date_fields = [
+        field for field in fields
+        if getattr(field, "auto_now_add", False)
+        or getattr(field, "auto_now", False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in date_fields]
+    for field in date_fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(date_fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def to_python(field, value):
+    if value == "" and field.null:
+        return None
+    return field.to_python(value)
+
+
+def get_dependencies(tables):
+    """Map every table to the tables its foreign keys refer to."""
+    table_names = {model: name for name, model in tables.items()}
+    return {
+        name: {
+            table_names[field.related_model]
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in table_names
+            and field.related_model is not model
+        }
+        for name, model in tables.items()
+    }
+
+
+def get_load_levels(tables):
+    """Split tables into levels that can be loaded one after another.
+
+    Tables of the same level do not refer to each other, so they can be
+    loaded concurrently once every previous level is loaded.
+    """
+    dependencies = get_dependencies(tables)
+    levels = []
+    loaded = set()
+    while len(loaded) < len(dependencies):
+        level = sorted(
+            name for name, depends_on in dependencies.items()
+            if name not in loaded and depends_on <= loaded
+        )
+        if not level:
+            raise ValueError("Tables have circular foreign keys")
+        levels.append(level)
+        loaded.update(level)
+    return levels
+
+
+def reset_sequences(*models):
+    """Move id sequences past the explicit ids inserted from csv files."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def load_csv(model, filename, batch_size=1000):
+    """Load a csv file with the fastest method the database supports.
+
+    PostgreSQL gets the file through COPY, other databases through
+    batched INSERTs. Id sequences are left to `reset_sequences`.
+
+    Args:
+        model (Model): model of the table to load
+        filename (str): path to the csv file with a header row
+        batch_size (int): number of rows inserted by a single query when
+            COPY is not available
+
+    Returns:
+        LoadResult: numbers of loaded and skipped rows
+    """
+    if connection.vendor == "postgresql":
+        return copy_csv(model, filename)
+    return insert_csv(model, filename, batch_size)
+
+
+def insert_csv(model, filename, batch_size=1000):
+    """Insert csv rows into the model's table with batched INSERTs.
+
+    The file is read as a stream. Foreign keys are checked against the ids
+    of every referenced table, fetched once before the first row; rows
+    pointing to missing objects are skipped. All batches are written in
+    one transaction.
+
+    Args:
+        model (Model): model of the table to load
+        filename (str): path to the csv file with a header row
+        batch_size (int): number of rows inserted by a single query
+
+    Returns:
+        LoadResult: numbers of loaded and skipped rows
+    """
+    result = LoadResult(model, filename)
+    started = time.monotonic()
+    with open(filename, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        fields = [get_model_field(model, column) for column in next(reader)]
+        known_ids = {
+            field.attname: set(
+                field.related_model.objects.values_list("pk", flat=True)
+            )
+            for field in fields if field.is_relation
+        }
+        batch = []
+        with transaction.atomic(), keep_auto_now(fields):
+            for row in reader:
+                values = {
+                    field.attname: to_python(field, value)
+                    for field, value in zip(fields, row)
+                }
+                if any(
+                    values[attname] is not None
+                    and values[attname] not in ids
+                    for attname, ids in known_ids.items()
+                ):
+                    result.skipped += 1
+                    continue
+                batch.append(model(**values))
+                if len(batch) >= batch_size:
+                    _insert(batch, result)
+                    batch = []
+            if batch:
+                _insert(batch, result)
+            if model is Review:
+                Title.objects.filter(
+                    pk__in=result.title_ids
+                ).refresh_ratings()
+            if model is Title:
+                search.index_titles()
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _get_defaults(model, fields):
+    """Return SQL values of the columns missing from a csv file.
+
+    The values are the ones the ORM would insert for an unset attribute.
+    """
+    columns, values = [], []
+    for field in model._meta.concrete_fields:
+        if field in fields or field.primary_key:
+            continue
+        if getattr(field, "auto_now_add", False) or getattr(
+                field, "auto_now", False):
+            value = timezone.now()
+        else:
+            value = field.get_default()
+        columns.append(field.column)
+        values.append(field.get_db_prep_save(value, connection))
+    return columns, values
+
+
+def copy_csv(model, filename):
+    """Load a csv file into PostgreSQL with COPY FROM STDIN.
+
+    The file is streamed as is into a temporary text staging table and
+    then merged into the model's table with a single INSERT ... SELECT,
+    which casts the values and skips rows pointing to missing objects.
+    """
+    result = LoadResult(model, filename)
+    started = time.monotonic()
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    staging = quote("staging_%s" % table)
+    with open(filename, newline="", encoding="utf-8") as f:
+        header = next(csv.reader([f.readline()]))
+        fields = [get_model_field(model, column) for column in header]
+        staged_columns = ", ".join(quote(field.column) for field in fields)
+        # rel_db_type() is the plain column type, "bigint" for "bigserial".
+        selected = [
+            ("NULLIF(s.{column}, '')::{type}"
+             if field.null or field.is_relation
+             else "s.{column}::{type}").format(
+                column=quote(field.column),
+                type=field.rel_db_type(connection),
+            )
+            for field in fields
+        ]
+        conditions = [
+            "(NULLIF(s.{column}, '') IS NULL OR EXISTS (SELECT 1 FROM"
+            " {parent} p WHERE p.{pk} = NULLIF(s.{column}, '')::{type}))"
+            .format(
+                column=quote(field.column),
+                parent=quote(field.related_model._meta.db_table),
+                pk=quote(field.target_field.column),
+                type=field.rel_db_type(connection),
+            )
+            for field in fields if field.is_relation
+        ]
+        default_columns, default_values = _get_defaults(model, fields)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE {staging} ({columns})"
+                " ON COMMIT DROP".format(
+                    staging=staging,
+                    columns=", ".join(
+                        "%s text" % quote(field.column) for field in fields),
+                )
+            )
+            # Unquoted empty values would be NULL, the casts above turn
+            # them into NULL only for the columns allowing it.
+            cursor.copy_expert(
+                "COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv,"
+                " FORCE_NOT_NULL ({columns}))"
+                .format(staging=staging, columns=staged_columns),
+                f,
+            )
+            cursor.execute("SELECT count(*) FROM %s" % staging)
+            staged = cursor.fetchone()[0]
+            cursor.execute(
+                "INSERT INTO {table} ({columns}) SELECT {values}"
+                " FROM {staging} s WHERE {conditions}".format(
+                    table=quote(table),
+                    columns=", ".join(
+                        [quote(field.column) for field in fields]
+                        + [quote(column) for column in default_columns]),
+                    values=", ".join(
+                        selected + ["%s"] * len(default_values)),
+                    staging=staging,
+                    conditions=" AND ".join(conditions) or "TRUE",
+                ),
+                default_values,
+            )
+            result.loaded = cursor.rowcount
+            result.skipped = staged - result.loaded
+            if model is Review:
+                Title.objects.filter(pk__in=RawSQL(
+                    "SELECT DISTINCT NULLIF(title_id, '')::bigint FROM %s"
+                    % staging, []
+                )).refresh_ratings()
+            if model is Title:
+                search.index_titles()
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _load_table(name, filename, batch_size):
+    return load_csv(TABLES[name], filename, batch_size)
+
+
+def load_directory(directory, batch_size=1000, workers=None):
+    """Load every `<table>.csv` file of a directory.
+
+    Tables are loaded level by level in foreign key order. Tables of one
+    level are loaded concurrently by worker processes, each in its own
+    transaction, on the database of the current connection. SQLite allows
+    a single writer, and workers do not see the rows of an uncommitted
+    transaction, so there the files are loaded one by one in the current
+    process. Sequences of every loaded table are reset at the end.
+
+    Args:
+        directory (str): directory with csv files named after the tables
+        batch_size (int): number of rows inserted by a single query
+        workers (int): maximum number of worker processes
+
+    Returns:
+        list: LoadResult of every loaded file
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if connection.vendor == "sqlite" or connection.in_atomic_block:
+        workers = 1
+    results = []
+    for level in get_load_levels(TABLES):
+        files = [
+            (name, os.path.join(directory, "%s.csv" % name))
+            for name in level
+        ]
+        files = [(name, path) for name, path in files if os.path.exists(path)]
+        if workers == 1 or len(files) == 1:
+            results.extend(
+                _load_table(name, path, batch_size) for name, path in files
+            )
+            continue
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(files)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+            initargs=(connection.settings_dict,),
+        ) as executor:
+            results.extend(executor.map(
+                _load_table,
+                *zip(*files),
+                [batch_size] * len(files),
+            ))
+    reset_sequences(*(result.model for result in results))
+    return results
+
+
+def _insert(batch, result):
+    result.model.objects.bulk_create(batch)
+    result.loaded += len(batch)
+    if result.model is Review:
+        result.title_ids.update(review.title_id for review in batch)
@@ -0,0 +1,17 @@
+"""Setup of the processes loading csv files in parallel.
+
+The module imports no models: worker processes unpickle the initializer
+before Django is set up.
+"""
+import django
+from django.db import connection
+
+
+def setup_worker(settings_dict):
+    """Set Django up in a worker process on the caller's database.
+
+    Workers read the settings module again, which names the configured
+    database rather than the one the caller uses, e.g. a test database.
+    """
+    django.setup()
+    connection.settings_dict.update(settings_dict)
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A')"
+    " || setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+FORWARD_SQL = {
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE TABLE reviews_title_search ('
+        ' title_id bigint PRIMARY KEY'
+        ' REFERENCES reviews_title (id) ON DELETE CASCADE,'
+        ' document tsvector NOT NULL)',
+        'CREATE INDEX reviews_title_search_document_idx'
+        ' ON reviews_title_search USING gin (document)',
+        'CREATE INDEX reviews_title_name_trgm_idx'
+        ' ON reviews_title USING gin (name gin_trgm_ops)',
+        'INSERT INTO reviews_title_search (title_id, document)'
+        ' SELECT id, %s FROM reviews_title' % POSTGRESQL_DOCUMENT,
+    ],
+    'sqlite': [
+        'CREATE VIRTUAL TABLE reviews_title_search USING fts5('
+        'name, description, tokenize = "unicode61 remove_diacritics 2")',
+        'INSERT INTO reviews_title_search (rowid, name, description)'
+        " SELECT id, name, coalesce(description, '') FROM reviews_title",
+    ],
+}
+
+BACKWARD_SQL = {
+    'postgresql': [
+        'DROP INDEX reviews_title_name_trgm_idx',
+        'DROP TABLE reviews_title_search',
+    ],
+    'sqlite': [
+        'DROP TABLE reviews_title_search',
+    ],
+}
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_comment_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_vendor_sql(FORWARD_SQL), run_vendor_sql(BACKWARD_SQL)
+        ),
+    ]
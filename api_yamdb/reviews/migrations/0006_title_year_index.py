@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-17 06:23
+
+from django.db import migrations, models
+import reviews.validators
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(db_index=True, validators=[reviews.validators.year_check], verbose_name='Год создания'),
+        ),
+    ]
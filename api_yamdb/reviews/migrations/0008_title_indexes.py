@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-17 06:46
+
+from django.db import migrations, models
+import reviews.validators
+
+# PostgreSQL compares UPPER(name::text) for icontains, which the trigram
+# index of 0005_title_search on the plain name does not serve.
+FORWARD_SQL = {
+    'postgresql': [
+        'CREATE INDEX reviews_title_name_upper_trgm_idx'
+        ' ON reviews_title USING gin (UPPER(name::text) gin_trgm_ops)',
+    ],
+}
+
+BACKWARD_SQL = {
+    'postgresql': [
+        'DROP INDEX reviews_title_name_upper_trgm_idx',
+    ],
+}
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='year',
+            field=models.IntegerField(validators=[reviews.validators.year_check], verbose_name='Год создания'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name', 'id'], name='title_name_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year', 'id'], name='title_year_id_idx'),
+        ),
+        migrations.RunPython(
+            run_vendor_sql(FORWARD_SQL), run_vendor_sql(BACKWARD_SQL)
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-17 14:05
+
+from django.db import migrations
+
+# The search table is not a model, so flush, and the transactional tests
+# using it, truncate reviews_title without it. A foreign key to the
+# titles makes that TRUNCATE fail on PostgreSQL.
+FORWARD_SQL = {
+    'postgresql': [
+        'ALTER TABLE reviews_title_search'
+        ' DROP CONSTRAINT reviews_title_search_title_id_fkey',
+    ],
+}
+
+BACKWARD_SQL = {
+    'postgresql': [
+        'DELETE FROM reviews_title_search WHERE title_id NOT IN'
+        ' (SELECT id FROM reviews_title)',
+        'ALTER TABLE reviews_title_search'
+        ' ADD CONSTRAINT reviews_title_search_title_id_fkey'
+        ' FOREIGN KEY (title_id) REFERENCES reviews_title (id)'
+        ' ON DELETE CASCADE',
+    ],
+}
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_vendor_sql(FORWARD_SQL), run_vendor_sql(BACKWARD_SQL)
+        ),
+    ]
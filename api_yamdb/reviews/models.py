@@ -3,6 +3,9 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from .validators import genre_slug_check, year_check
 
@@ -15,6 +18,7 @@ class Category(models.Model):
     name = models.CharField(max_length=256)
     slug = models.SlugField(max_length=50,
                             validators=[genre_slug_check], unique=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     def __str__(self):
         return "{name: '%s', slug: '%s'}" % (self.name, self.slug)
@@ -26,11 +30,70 @@ class Genre(models.Model):
     name = models.CharField(max_length=256)
     slug = models.SlugField(max_length=50,
                             validators=[genre_slug_check], unique=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     def __str__(self):
         return f"name: {self.name}, slug: {self.slug}"
 
 
+class TitleQuerySet(models.QuerySet):
+    """Title queryset."""
+
+    @staticmethod
+    def _review_totals():
+        """Build correlated subqueries for a title's score sum and count."""
+        reviews = Review.objects.filter(
+            title=OuterRef("pk")
+        ).order_by().values("title")
+        score_sum = Coalesce(
+            Subquery(reviews.annotate(total=Sum("score")).values("total")), 0
+        )
+        review_count = Coalesce(
+            Subquery(reviews.annotate(total=Count("pk")).values("total")), 0
+        )
+        return score_sum, review_count
+
+    def for_read(self):
+        """Load everything the title read serializer emits.
+
+        The category is joined and the genres are prefetched, so a page of
+        titles costs the same number of queries whatever its size. Titles
+        come in primary key order unless the request orders them.
+        """
+        return self.select_related("category").prefetch_related(
+            "genre"
+        ).order_by("pk")
+
+    def with_actual_ratings(self):
+        """Annotate titles with the totals computed from their reviews."""
+        score_sum, review_count = self._review_totals()
+        return self.annotate(
+            actual_score_sum=score_sum,
+            actual_review_count=review_count,
+        )
+
+    def refresh_ratings(self):
+        """Recompute stored rating totals from reviews in one UPDATE.
+
+        Returns:
+            int: number of updated titles
+        """
+        score_sum, review_count = self._review_totals()
+        return self.update(
+            score_sum=score_sum,
+            review_count=review_count,
+            updated_at=timezone.now(),
+        )
+
+    def touch(self):
+        """Mark titles as changed after a change of their related data.
+
+        Returns:
+            int: number of updated titles
+        """
+        return self.update(updated_at=timezone.now())
+
+
 class Title(models.Model):
     """Title model class."""
 
@@ -45,10 +108,34 @@ class Title(models.Model):
     year = models.IntegerField("Год создания", validators=[year_check])
     description = models.TextField("Описание", null=True, blank=True)
     genre = models.ManyToManyField(Genre, blank=True, related_name='titles')
+    score_sum = models.PositiveIntegerField(
+        "Сумма оценок", default=0, editable=False)
+    review_count = models.PositiveIntegerField(
+        "Количество отзывов", default=0, editable=False)
+    # Also moved forward by changes of the category, the genres and the
+    # reviews of the title, see reviews.signals.
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+
+    objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orderings of the title list, the primary key breaks ties.
+            # Year filters use the year index too.
+            models.Index(fields=["name", "id"], name="title_name_id_idx"),
+            models.Index(fields=["year", "id"], name="title_year_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        """Average review score kept up to date by the review signals."""
+        if not self.review_count:
+            return None
+        return self.score_sum / self.review_count
+
 
 class Review(models.Model):
     """Review model class."""
@@ -80,12 +167,17 @@ class Review(models.Model):
         ],
     )
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["author", "title_id"],
                                     name="unique review")
         ]
+        indexes = [
+            models.Index(fields=["title", "pub_date", "id"],
+                         name="review_title_pub_date_idx"),
+        ]
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
         ordering = ["pub_date"]
@@ -93,6 +185,15 @@ class Review(models.Model):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored score and title so that the rating signals
+        # can apply a delta instead of recounting the title's reviews.
+        instance._loaded_score = instance.__dict__.get("score")
+        instance._loaded_title_id = instance.__dict__.get("title_id")
+        return instance
+
 
 class Comment(models.Model):
     """Comment model class."""
@@ -112,5 +213,10 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(fields=["review", "pub_date", "id"],
+                         name="comment_review_pub_date_idx"),
+        ]
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
+        ordering = ["pub_date"]
@@ -0,0 +1,156 @@
+"""Full-text search over titles.
+
+Titles are indexed in the `reviews_title_search` shadow table created by
+the `0005_title_search` migration:
+
+* on PostgreSQL it stores a weighted tsvector of the name and description
+  behind a GIN index; names also have a trigram GIN index for fuzzy and
+  partial matches;
+* on SQLite it is an FTS5 virtual table ranked with bm25.
+
+Both backends match titles containing a prefix of every searched word.
+Rows are removed by the `post_delete` signal of titles rather than by a
+foreign key, so that flush can truncate the titles; rows of titles deleted
+in SQL never match, searches are limited to existing titles.
+
+Other databases fall back to a plain `icontains` lookup on the name.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = "reviews_title_search"
+SEARCH_CONFIG = "simple"
+
+POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('{config}', coalesce(name, '')), 'A')"
+    " || setweight(to_tsvector('{config}', coalesce(description, '')), 'B')"
+).format(config=SEARCH_CONFIG)
+
+
+def _where_id_in(column, ids):
+    if ids is None:
+        return "", []
+    return (
+        " WHERE %s IN (%s)" % (column, ", ".join(["%s"] * len(ids))),
+        list(ids),
+    )
+
+
+def index_titles(ids=None):
+    """Write titles into the search table.
+
+    Args:
+        ids (list): ids of the titles to index, all titles when None
+    """
+    if connection.vendor not in ("postgresql", "sqlite"):
+        return
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+    condition, params = _where_id_in("id", ids)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "INSERT INTO {table} (title_id, document)"
+                " SELECT id, {document} FROM reviews_title{condition}"
+                " ON CONFLICT (title_id)"
+                " DO UPDATE SET document = EXCLUDED.document".format(
+                    table=SEARCH_TABLE,
+                    document=POSTGRESQL_DOCUMENT,
+                    condition=condition,
+                ),
+                params,
+            )
+        else:
+            remove_titles(ids)
+            cursor.execute(
+                "INSERT INTO {table} (rowid, name, description)"
+                " SELECT id, name, coalesce(description, '')"
+                " FROM reviews_title{condition}".format(
+                    table=SEARCH_TABLE, condition=condition),
+                params,
+            )
+
+
+def remove_titles(ids=None):
+    """Delete titles from the search table.
+
+    Args:
+        ids (list): ids of the titles to remove, all titles when None
+    """
+    if connection.vendor not in ("postgresql", "sqlite"):
+        return
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+    column = "title_id" if connection.vendor == "postgresql" else "rowid"
+    condition, params = _where_id_in(column, ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM {table}{condition}".format(
+                table=SEARCH_TABLE, condition=condition),
+            params,
+        )
+
+
+def _prefix_query(text, template, separator):
+    """Build a query matching titles with a prefix of every input word."""
+    return separator.join(
+        template % word for word in re.findall(r"\w+", text)
+    )
+
+
+def search_titles(queryset, text):
+    """Filter titles matching the text, most relevant first.
+
+    Matching titles are annotated with `search_rank`, the higher the more
+    relevant.
+    """
+    text = text.strip()
+    if not re.search(r"\w", text):
+        return queryset
+    if connection.vendor == "postgresql":
+        query = _prefix_query(text, "%s:*", " & ")
+        matches = RawSQL(
+            "SELECT title_id FROM {table}"
+            " WHERE document @@ to_tsquery('{config}', %s)"
+            " UNION SELECT id FROM reviews_title WHERE name %% %s".format(
+                table=SEARCH_TABLE, config=SEARCH_CONFIG),
+            [query, text],
+        )
+        rank = RawSQL(
+            "coalesce((SELECT ts_rank(document,"
+            " to_tsquery('{config}', %s)) FROM {table}"
+            " WHERE title_id = reviews_title.id), 0)"
+            " + similarity(reviews_title.name, %s)".format(
+                table=SEARCH_TABLE, config=SEARCH_CONFIG),
+            [query, text],
+            output_field=FloatField(),
+        )
+    elif connection.vendor == "sqlite":
+        query = _prefix_query(text, '"%s"*', " ")
+        matches = RawSQL(
+            "SELECT rowid FROM {table} WHERE {table} MATCH %s".format(
+                table=SEARCH_TABLE),
+            [query],
+        )
+        rank = RawSQL(
+            # Names weigh more than descriptions, as with setweight().
+            "SELECT -bm25({table}, 10.0, 1.0) FROM {table}"
+            " WHERE {table} MATCH %s AND rowid = reviews_title.id".format(
+                table=SEARCH_TABLE),
+            [query],
+            output_field=FloatField(),
+        )
+    else:
+        return queryset.filter(name__icontains=text).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.filter(pk__in=matches).annotate(
+        search_rank=rank
+    ).order_by("-search_rank", "pk")
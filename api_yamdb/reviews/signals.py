@@ -0,0 +1,112 @@
+"""Signal handlers keeping denormalized title data in sync."""
+
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import User
+
+from . import search
+from .models import Category, Genre, Review, Title
+
+
+def _change_title_totals(title_id, score_delta, count_delta):
+    Title.objects.filter(pk=title_id).update(
+        score_sum=F("score_sum") + score_delta,
+        review_count=F("review_count") + count_delta,
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Review)
+def add_review_score(sender, instance, created, raw=False, **kwargs):
+    """Apply a created or edited review's score to its title totals."""
+    if raw:
+        return
+    if created:
+        _change_title_totals(instance.title_id, instance.score, 1)
+    else:
+        old_score = getattr(instance, "_loaded_score", None)
+        old_title_id = getattr(instance, "_loaded_title_id", None)
+        if old_score is None or old_title_id is None:
+            # The instance was not loaded from the database, so the
+            # previous values are unknown and the title is recounted.
+            Title.objects.filter(pk=instance.title_id).refresh_ratings()
+        elif old_title_id != instance.title_id:
+            _change_title_totals(old_title_id, -old_score, -1)
+            _change_title_totals(instance.title_id, instance.score, 1)
+        elif old_score != instance.score:
+            _change_title_totals(
+                instance.title_id, instance.score - old_score, 0)
+    instance._loaded_score = instance.score
+    instance._loaded_title_id = instance.title_id
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_score(sender, instance, **kwargs):
+    """Withdraw a deleted review's score from its title totals."""
+    score = getattr(instance, "_loaded_score", None)
+    if score is None:
+        score = instance.score
+    title_id = getattr(instance, "_loaded_title_id", None)
+    if title_id is None:
+        title_id = instance.title_id
+    _change_title_totals(title_id, -score, -1)
+
+
+@receiver(post_save, sender=Title)
+def index_title(sender, instance, raw=False, **kwargs):
+    """Write a saved title into the search table."""
+    if not raw:
+        search.index_titles([instance.pk])
+
+
+@receiver(post_delete, sender=Title)
+def unindex_title(sender, instance, **kwargs):
+    """Remove a deleted title from the search table."""
+    search.remove_titles([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, created=False, raw=False,
+                          **kwargs):
+    """Mark the titles rendering a changed or deleted category as changed."""
+    if not created and not raw:
+        Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_genre_titles(sender, instance, created=False, raw=False,
+                       **kwargs):
+    """Mark the titles rendering a changed or deleted genre as changed."""
+    if not created and not raw:
+        Title.objects.filter(genre=instance).touch()
+
+
+@receiver(post_save, sender=User)
+def touch_renamed_author_reviews(sender, instance, created, raw=False,
+                                 **kwargs):
+    """Mark the reviews rendering a renamed author as changed."""
+    if not created and not raw and (
+            getattr(instance, "_loaded_username", None) != instance.username):
+        Review.objects.filter(author=instance).update(
+            updated_at=timezone.now())
+    instance._loaded_username = instance.username
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_with_changed_genres(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    """Mark titles whose set of genres changed as changed."""
+    if action == "pre_clear" and reverse:
+        # Titles losing a cleared genre are only known before the clear.
+        Title.objects.filter(genre=instance).touch()
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            Title.objects.filter(pk=instance.pk).touch()
+        elif pk_set:
+            Title.objects.filter(pk__in=pk_set).touch()
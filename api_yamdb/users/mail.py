@@ -0,0 +1,84 @@
+"""Outbox for emails sent outside of the request cycle."""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FAILED, PENDING, SENT, QueuedEmail
+
+
+def queue_mail(subject, body, from_email, to):
+    """Put an email into the outbox and return without sending it."""
+    return QueuedEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        to="\n".join(to),
+    )
+
+
+def _retry_later(message, error, now):
+    message.attempts += 1
+    message.last_error = str(error)
+    max_attempts = getattr(settings, "MAIL_QUEUE_MAX_ATTEMPTS", 5)
+    if message.attempts >= max_attempts:
+        message.status = FAILED
+        return
+    delay = getattr(settings, "MAIL_QUEUE_RETRY_DELAY", 60)
+    message.next_attempt_at = now + timedelta(
+        seconds=delay * 2 ** (message.attempts - 1))
+
+
+def send_queued_mail(batch_size=100):
+    """Send a batch of due emails over a single mail connection.
+
+    Failed emails are retried with exponential backoff until
+    MAIL_QUEUE_MAX_ATTEMPTS is reached. Locked rows are skipped, so several
+    workers can drain the outbox at once.
+
+    Args:
+        batch_size (int): maximum number of emails sent
+
+    Returns:
+        tuple: numbers of sent and failed emails
+    """
+    sent = failed = 0
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        if not messages:
+            return sent, failed
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            for message in messages:
+                _retry_later(message, error, now)
+            failed = len(messages)
+        else:
+            try:
+                for message in messages:
+                    try:
+                        connection.send_messages(
+                            [message.as_email_message(connection)])
+                    except Exception as error:
+                        _retry_later(message, error, now)
+                        failed += 1
+                    else:
+                        message.status = SENT
+                        message.sent_at = timezone.now()
+                        sent += 1
+            finally:
+                connection.close()
+        QueuedEmail.objects.bulk_update(
+            messages,
+            ["status", "attempts", "next_attempt_at", "last_error",
+             "sent_at"],
+        )
+    return sent, failed
@@ -0,0 +1,44 @@
+"""Custom manage.py command delivering emails from the outbox."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends queued emails in batches over one mail connection per batch."
+        " Runs until stopped and polls the outbox every --interval seconds"
+        " when it is empty. Use --once to send a single batch and exit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of emails sent over one connection.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when there is nothing to send.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send one batch and exit.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(options["batch_size"])
+            if sent or failed:
+                self.stdout.write(
+                    "Sent %d emails, %d failed" % (sent, failed))
+            if options["once"]:
+                return
+            if not sent and not failed:
+                time.sleep(options["interval"])
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_queuedemail'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX users_user_email_lower_uniq'
+            ' ON users_user (LOWER(email))',
+            reverse_sql='DROP INDEX users_user_email_lower_uniq',
+        ),
+    ]
@@ -1,6 +1,8 @@
 """User's custom model"""
 from django.contrib.auth.models import AbstractUser
+from django.core.mail import EmailMessage
 from django.db import models
+from django.utils import timezone
 
 from .manager import UserManager
 
@@ -14,6 +16,16 @@ ROLES = [
     (ADMIN, ADMIN),
 ]
 
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+MAIL_STATUSES = [
+    (PENDING, PENDING),
+    (SENT, SENT),
+    (FAILED, FAILED),
+]
+
 
 class User(AbstractUser):
     """User's custom model."""
@@ -25,6 +37,8 @@ class User(AbstractUser):
         help_text="Required. 150 characters or fewer."
     )
 
+    # Emails are also unique regardless of case, the LOWER(email) index is
+    # created by the 0003_user_email_lower_index migration.
     email = models.EmailField(
         verbose_name="почтовый адрес",
         unique=True,
@@ -64,6 +78,13 @@ class User(AbstractUser):
         super(User, self).save(*args, **kwargs)
         return self
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Reviews render the username, see reviews.signals.
+        instance._loaded_username = instance.__dict__.get("username")
+        return instance
+
     def __str__(self):
         return self.email
 
@@ -77,3 +98,52 @@ class User(AbstractUser):
 
     class Meta:
         verbose_name = "Пользователь"
+
+
+class QueuedEmail(models.Model):
+    """Outgoing email waiting for the `sendqueuedmail` worker."""
+    subject = models.CharField(verbose_name="Тема", max_length=255)
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(verbose_name="Отправитель", max_length=254)
+    to = models.TextField(
+        verbose_name="Получатели",
+        help_text="One address per line.")
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=10,
+        choices=MAIL_STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попытки отправки",
+        default=0)
+    next_attempt_at = models.DateTimeField(
+        verbose_name="Следующая попытка",
+        default=timezone.now)
+    last_error = models.TextField(verbose_name="Последняя ошибка", blank=True)
+    created_at = models.DateTimeField(
+        verbose_name="Создано",
+        auto_now_add=True)
+    sent_at = models.DateTimeField(
+        verbose_name="Отправлено",
+        null=True,
+        blank=True)
+
+    def __str__(self):
+        return self.subject
+
+    def as_email_message(self, connection=None):
+        return EmailMessage(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to.splitlines(),
+            connection=connection,
+        )
+
+    class Meta:
+        verbose_name = "Письмо в очереди"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"],
+                         name="queued_email_due_idx"),
+        ]
@@ -1,9 +1,46 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import user_cache
+from users.models import User
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start and end every test without cached responses and users."""
+    cache.clear()
+    user_cache.clear()
+    yield
+    cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture
+def admin_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create(
+        username='admin', email='admin@yamdb.fake', role='admin'))
+    return client
+
+
+@pytest.fixture
+def token_client():
+    """Return a factory of clients sending a JWT of the given user."""
+    def make_client(user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION='Bearer %s' % AccessToken.for_user(user))
+        return client
+    return make_client
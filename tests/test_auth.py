@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+
+def user_queries(client):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get('/api/v1/users/me/')
+    assert response.status_code == 200
+    return response, [
+        query['sql'] for query in context.captured_queries
+        if 'users_user' in query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+
+    def test_user_is_loaded_once(self, token_client):
+        client = token_client(User.objects.create(
+            username='reader', email='reader@yamdb.fake'))
+
+        assert len(user_queries(client)[1]) == 1
+        assert user_queries(client)[1] == [], (
+            'Проверьте, что пользователь берётся из кэша'
+        )
+
+    def test_saved_user_is_reloaded(self, token_client):
+        user = User.objects.create(
+            username='reader', email='reader@yamdb.fake')
+        client = token_client(user)
+        user_queries(client)
+
+        user.bio = 'Читатель'
+        user.save()
+        response, queries = user_queries(client)
+
+        assert len(queries) == 1
+        assert response.json()['bio'] == 'Читатель'
+
+    def test_deleted_user_is_rejected(self, token_client):
+        user = User.objects.create(
+            username='reader', email='reader@yamdb.fake')
+        client = token_client(user)
+        user_queries(client)
+
+        user.delete()
+
+        assert client.get('/api/v1/users/me/').status_code == 401
+
+    def test_least_recently_used_user_is_evicted(self, settings, token_client):
+        settings.AUTH_USER_CACHE_SIZE = 1
+        first, second = (
+            token_client(User.objects.create(
+                username=name, email='%s@yamdb.fake' % name))
+            for name in ('first', 'second')
+        )
+        user_queries(first)
+        user_queries(second)
+
+        assert len(user_queries(first)[1]) == 1
+
+    def test_expired_user_is_reloaded(self, settings, token_client):
+        settings.AUTH_USER_CACHE_TIMEOUT = 0
+        client = token_client(User.objects.create(
+            username='reader', email='reader@yamdb.fake'))
+        user_queries(client)
+
+        assert len(user_queries(client)[1]) == 1
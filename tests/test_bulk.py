@@ -0,0 +1,155 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Category, Genre, Title
+from users.models import User
+
+
+def create_catalog():
+    Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    for number in range(10):
+        Genre.objects.create(name=f'Жанр {number}', slug=f'genre-{number}')
+
+
+@pytest.mark.django_db
+class TestBulkWrites:
+
+    def test_only_admin_can_write_in_bulk(self):
+        url = '/api/v1/genres/bulk/'
+        data = [{'name': 'Драма', 'slug': 'drama'}]
+        client = APIClient()
+
+        assert client.post(url, data, format='json').status_code == 401
+        client.force_authenticate(User.objects.create(
+            username='reader', email='reader@yamdb.fake'))
+        assert client.post(url, data, format='json').status_code == 403
+
+    def test_genres_are_created_and_updated(
+            self, admin_client, django_capture_on_commit_callbacks):
+        Genre.objects.create(name='Драма', slug='drama')
+        admin_client.get('/api/v1/genres/')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post('/api/v1/genres/bulk/', [
+                {'name': 'Драма и мелодрама', 'slug': 'drama'},
+                {'name': 'Комедия', 'slug': 'comedy'},
+            ], format='json')
+
+        assert response.status_code == 200
+        assert [item['status'] for item in response.data] == [
+            'updated', 'created']
+        assert Genre.objects.get(slug='drama').name == 'Драма и мелодрама'
+        names = [
+            genre['name']
+            for genre in admin_client.get('/api/v1/genres/').data['results']
+        ]
+        assert 'Комедия' in names, (
+            'Проверьте, что массовая запись сбрасывает кэш списка жанров'
+        )
+
+    def test_invalid_item_rejects_whole_request(self, admin_client):
+        response = admin_client.post('/api/v1/categories/bulk/', [
+            {'name': 'Фильм', 'slug': 'movie'},
+            {'name': 'Книга'},
+            {'name': 'Кино', 'slug': 'movie'},
+        ], format='json')
+
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert 'slug' in response.data[1]
+        assert 'slug' in response.data[2]
+        assert not Category.objects.exists()
+
+    def test_titles_resolve_slugs_once_per_table(self, admin_client):
+        create_catalog()
+        genres = [f'genre-{number}' for number in range(10)]
+        items = [
+            {'name': f'Произведение {number}', 'year': 2000,
+             'category': 'movie', 'genre': genres}
+            for number in range(20)
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                '/api/v1/titles/bulk/', items, format='json')
+
+        assert response.status_code == 200
+        assert Title.objects.count() == 20
+        assert Title.genre.through.objects.count() == 200
+        assert response.data[0]['data']['genre'] == genres
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+        for table in ('reviews_category', 'reviews_genre'):
+            assert len([
+                sql for sql in selects
+                if sql.split(' WHERE ')[0].endswith('FROM "%s"' % table)
+            ]) == 1, (
+                'Проверьте, что слаги каждой таблицы загружаются одним '
+                'запросом'
+            )
+
+    def test_titles_are_updated_by_id(self, admin_client):
+        create_catalog()
+        title = Title.objects.create(
+            name='Произведение', year=2000,
+            category=Category.objects.get(slug='movie'))
+        title.genre.set(Genre.objects.filter(slug='genre-0'))
+
+        response = admin_client.post('/api/v1/titles/bulk/', [
+            {'id': title.id, 'category': 'book', 'genre': ['genre-1']},
+        ], format='json')
+
+        assert response.status_code == 200
+        assert response.data[0]['status'] == 'updated'
+        title.refresh_from_db()
+        assert title.category.slug == 'book'
+        assert list(title.genre.values_list('slug', flat=True)) == [
+            'genre-1']
+        assert title.name == 'Произведение'
+
+    def test_genre_change_modifies_title(self, admin_client):
+        create_catalog()
+        title = Title.objects.create(
+            name='Произведение', year=2000,
+            category=Category.objects.get(slug='movie'))
+        title.genre.set(Genre.objects.filter(slug='genre-0'))
+        url = f'/api/v1/titles/{title.id}/'
+        etag = admin_client.get(url)['ETag']
+
+        response = admin_client.post('/api/v1/titles/bulk/', [
+            {'id': title.id, 'genre': ['genre-1']},
+        ], format='json')
+
+        assert response.status_code == 200
+        response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена жанров меняет ETag произведения'
+        )
+        assert response.data['genre'][0]['slug'] == 'genre-1'
+
+    def test_unknown_references_are_reported(self, admin_client):
+        create_catalog()
+
+        response = admin_client.post('/api/v1/titles/bulk/', [
+            {'id': 100, 'name': 'Произведение', 'year': 2000,
+             'category': 'movie', 'genre': ['genre-0']},
+            {'name': 'Произведение', 'year': 2000,
+             'category': 'game', 'genre': ['genre-0']},
+        ], format='json')
+
+        assert response.status_code == 400
+        assert 'id' in response.data[0]
+        assert 'category' in response.data[1]
+        assert not Title.objects.exists()
+
+    def test_bulk_requires_a_list(self, admin_client):
+        response = admin_client.post(
+            '/api/v1/genres/bulk/', {'name': 'Драма', 'slug': 'drama'},
+            format='json')
+
+        assert response.status_code == 400
@@ -0,0 +1,70 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.cache import get_version
+from reviews.models import Category, Genre
+
+
+@pytest.mark.django_db
+class TestCachedLists:
+
+    @pytest.mark.parametrize('url, model', [
+        ('/api/v1/categories/', Category),
+        ('/api/v1/genres/', Genre),
+    ])
+    def test_repeated_list_is_served_from_cache(self, url, model):
+        model.objects.create(name='Фильм', slug='movie')
+        APIClient().get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url)
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert len(context) == 0, (
+            f'Проверьте, что повторный GET-запрос к `{url}` '
+            'не обращается к БД'
+        )
+
+    @pytest.mark.parametrize('url, model', [
+        ('/api/v1/categories/', Category),
+        ('/api/v1/genres/', Genre),
+    ])
+    def test_writes_invalidate_cached_list(
+            self, admin_client, django_capture_on_commit_callbacks, url,
+            model):
+        model.objects.create(name='Фильм', slug='movie')
+        assert APIClient().get(url).data['count'] == 1
+        assert APIClient().get(f'{url}?search=Книга').data['count'] == 0
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = admin_client.post(
+                url, {'name': 'Книга', 'slug': 'book'})
+        assert response.status_code == 201
+        assert APIClient().get(url).data['count'] == 2
+        assert APIClient().get(f'{url}?search=Книга').data['count'] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            admin_client.delete(f'{url}movie/')
+        assert APIClient().get(url).data['count'] == 1
+
+        with django_capture_on_commit_callbacks(execute=True):
+            model.objects.filter(slug='book').get().delete()
+        assert APIClient().get(url).data['count'] == 0, (
+            'Проверьте, что изменения через админку сбрасывают кеш списка'
+        )
+
+    def test_cached_list_is_invalidated_on_commit(
+            self, django_capture_on_commit_callbacks):
+        version = get_version('reviews.genre')
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            Genre.objects.create(name='Драма', slug='drama')
+            assert get_version('reviews.genre') == version, (
+                'Проверьте, что версия кеша не меняется до коммита транзакции'
+            )
+        for callback in callbacks:
+            callback()
+
+        assert get_version('reviews.genre') != version
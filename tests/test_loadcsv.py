@@ -0,0 +1,92 @@
+import os
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+DATA_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+TABLES = (
+    'category', 'genre', 'users', 'titles', 'genre_title', 'review',
+    'comments',
+)
+
+
+@pytest.mark.django_db
+class TestLoadCsv:
+
+    def test_loads_bundled_data(self):
+        for table in TABLES:
+            call_command(
+                'loadcsv', table, os.path.join(DATA_DIR, f'{table}.csv'),
+                batch_size=10, stdout=StringIO()
+            )
+
+        assert Title.objects.count() == 32
+        assert Title.genre.through.objects.count() == 42
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        assert Review.objects.get(pk=1).pub_date.year == 2019, (
+            'Проверьте, что дата публикации берётся из csv-файла'
+        )
+        assert not Title.objects.with_actual_ratings().exclude(
+            score_sum=F('actual_score_sum'),
+            review_count=F('actual_review_count'),
+        ).exists(), 'Проверьте, что рейтинги пересчитаны после загрузки'
+
+    def test_loads_directory_in_dependency_order(self):
+        call_command(
+            'loadcsv', '--all', DATA_DIR, workers=1, stdout=StringIO())
+
+        assert Title.objects.count() == 32
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        title = Title.objects.create(name='Новое произведение', year=2000)
+        assert title.id > 32, (
+            'Проверьте, что последовательности id сдвинуты после загрузки'
+        )
+
+    def test_rows_of_missing_objects_are_skipped(self, tmp_path):
+        title = Title.objects.create(name='Произведение', year=2000)
+        author = User.objects.create(
+            username='author', email='author@yamdb.fake'
+        )
+        reviews = tmp_path / 'review.csv'
+        reviews.write_text(
+            'id,title_id,text,author,score,pub_date\n'
+            f'1,{title.id},Отзыв,{author.id},7,2019-09-24T21:08:21.567Z\n'
+            f'2,{title.id + 1},Отзыв,{author.id},5,2019-09-24T21:08:21.567Z\n'
+        )
+        out = StringIO()
+        call_command('loadcsv', 'review', str(reviews), stdout=out)
+
+        assert list(Review.objects.values_list('pk', flat=True)) == [1]
+        assert 'Skipped 1 rows' in out.getvalue(), (
+            'Проверьте, что строки с несуществующими объектами пропускаются'
+        )
+        title.refresh_from_db()
+        assert (title.score_sum, title.review_count) == (7, 1)
+
+    def test_bad_value_is_reported(self, tmp_path):
+        titles = tmp_path / 'titles.csv'
+        titles.write_text('id,name,year,category\n1,Произведение,год,\n')
+
+        with pytest.raises(CommandError):
+            call_command('loadcsv', 'titles', str(titles), stdout=StringIO())
+        assert not Title.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_workers_load_into_the_current_database():
+    call_command('loadcsv', '--all', DATA_DIR, workers=2, stdout=StringIO())
+
+    assert Title.objects.count() == 32, (
+        'Проверьте, что процессы загрузки пишут в базу вызывающего кода'
+    )
+    assert Review.objects.count() == 72
+    assert Comment.objects.count() == 3
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from api_yamdb import metrics
+from reviews.models import Genre
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    metrics._metrics = None
+    yield tmp_path
+    metrics._metrics = None
+
+
+def parse_metrics(text):
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        name, value = line.rsplit(' ', 1)
+        samples[name] = float(value)
+    return samples
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_requests_are_counted_by_view(self):
+        Genre.objects.create(name='Драма', slug='drama')
+        client = APIClient()
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        client.get('/unknown/')
+
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith(
+            'text/plain; version=0.0.4')
+        samples = parse_metrics(response.content.decode())
+        labels = 'action="list",view="GenreViewSet"'
+        assert samples[
+            'yamdb_http_requests_total{action="list",method="GET",'
+            'status="200",view="GenreViewSet"}'] == 2
+        assert samples[
+            'yamdb_http_request_duration_seconds_count{%s}' % labels] == 2
+        assert samples[
+            'yamdb_http_request_duration_seconds_bucket{action="list",'
+            'le="+Inf",view="GenreViewSet"}'] == 2
+        assert samples['yamdb_db_queries_sum{%s}' % labels] >= 1
+        assert samples['yamdb_http_response_size_bytes_sum{%s}' % labels] > 0
+        assert samples[
+            'yamdb_http_requests_total{action="",method="GET",'
+            'status="404",view="unmatched"}'] == 1, (
+            'Проверьте, что адреса без представления не становятся метками'
+        )
+
+    def test_compose_network_scrape_is_allowed(self):
+        response = APIClient(HTTP_HOST='web:8000').get('/metrics')
+
+        assert response.status_code == 200, (
+            'Проверьте, что /metrics доступен по адресу web:8000 из сети '
+            'docker compose'
+        )
+
+    def test_workers_are_summed(self, metrics_dir):
+        APIClient().get('/api/v1/genres/')
+        key = json.dumps({'action': 'list', 'view': 'GenreViewSet'})
+        counter_key = json.dumps({
+            'action': 'list', 'method': 'GET', 'status': '200',
+            'view': 'GenreViewSet',
+        })
+        buckets = metrics.HISTOGRAMS['yamdb_db_queries'][1]
+        (metrics_dir / 'worker-1-other.json').write_text(json.dumps({
+            'counters': {'yamdb_http_requests_total': {counter_key: 3}},
+            'histograms': {
+                'yamdb_db_queries': {key: [0] * (len(buckets) + 1) + [6, 3]},
+            },
+        }))
+
+        samples = parse_metrics(APIClient().get('/metrics').content.decode())
+
+        assert samples[
+            'yamdb_http_requests_total{action="list",method="GET",'
+            'status="200",view="GenreViewSet"}'] == 4, (
+            'Проверьте, что метрики всех процессов суммируются'
+        )
+        assert samples[
+            'yamdb_db_queries_count{action="list",view="GenreViewSet"}'] == 4
@@ -0,0 +1,91 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from reviews.models import Genre
+from users.models import User
+
+
+@pytest.fixture(autouse=True)
+def profiling(settings, tmp_path):
+    settings.PROFILING_USERS = ['admin']
+    settings.PROFILING_DIR = str(tmp_path)
+    return tmp_path
+
+
+def create_user(username, role='admin'):
+    return User.objects.create(
+        username=username, email='%s@yamdb.fake' % username, role=role)
+
+
+@pytest.mark.django_db
+class TestProfiling:
+
+    def test_allowed_admin_saves_profile(self, profiling, token_client):
+        Genre.objects.create(name='Драма', slug='drama')
+        client = token_client(create_user('admin'))
+
+        response = client.get('/api/v1/genres/?profile=1')
+
+        assert response.status_code == 200
+        profile_id = response['X-Profile-Id']
+        assert (profiling / f'{profile_id}.prof').exists()
+        with open(profiling / f'{profile_id}.json') as f:
+            profile = json.load(f)
+        assert profile['user'] == 'admin'
+        assert profile['path'] == '/api/v1/genres/?profile=1'
+        assert any(
+            'reviews_genre' in query['sql'] for query in profile['queries']
+        ), 'Проверьте, что вместе с профилем сохраняется SQL запроса'
+
+    def test_header_triggers_profiling(self, token_client):
+        response = token_client(create_user('admin')).get(
+            '/api/v1/genres/', HTTP_X_PROFILE='1')
+
+        assert 'X-Profile-Id' in response
+
+    @pytest.mark.parametrize('username,role', [
+        ('admin', 'user'),
+        ('other', 'admin'),
+    ])
+    def test_other_users_are_not_profiled(
+            self, profiling, token_client, username, role):
+        response = token_client(create_user(username, role)).get(
+            '/api/v1/genres/?profile=1')
+
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response
+        assert not list(profiling.iterdir())
+
+    def test_anonymous_is_not_profiled(self):
+        response = APIClient().get('/api/v1/genres/?profile=1')
+
+        assert 'X-Profile-Id' not in response
+
+    def test_old_profiles_are_rotated(self, settings, profiling, token_client):
+        settings.PROFILING_KEEP = 2
+        client = token_client(create_user('admin'))
+        ids = [
+            client.get('/api/v1/genres/?profile=1')['X-Profile-Id']
+            for _ in range(3)
+        ]
+
+        assert sorted(path.stem for path in profiling.glob('*.json')) == (
+            ids[1:])
+
+    def test_command_lists_and_summarizes_profiles(self, token_client):
+        profile_id = token_client(create_user('admin')).get(
+            '/api/v1/genres/?profile=1')['X-Profile-Id']
+
+        out = StringIO()
+        call_command('profiles', stdout=out)
+        assert profile_id in out.getvalue()
+        assert '/api/v1/genres/?profile=1' in out.getvalue()
+
+        out = StringIO()
+        call_command('profiles', 'latest', limit=5, stdout=out)
+        assert 'function calls' in out.getvalue()
+        assert 'reviews_genre' in out.getvalue()
@@ -0,0 +1,122 @@
+from importlib import import_module
+from io import StringIO
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+
+from reviews.models import Review, Title
+from users.models import User
+
+backfill = import_module('reviews.migrations.0003_title_rating_totals')
+
+
+def create_review(title, number, score):
+    author = User.objects.create(
+        username=f'user{number}', email=f'user{number}@yamdb.fake'
+    )
+    return Review.objects.create(
+        title=title, author=author, text=f'Отзыв {number}', score=score
+    )
+
+
+def get_totals(title):
+    title.refresh_from_db()
+    return title.score_sum, title.review_count
+
+
+@pytest.fixture
+def title():
+    title = Title.objects.create(name='Произведение', year=2000)
+    create_review(title, 1, 4)
+    create_review(title, 2, 8)
+    return title
+
+
+@pytest.mark.django_db
+class TestRatingSignals:
+
+    def test_created_reviews_are_counted(self, title):
+        assert get_totals(title) == (12, 2)
+
+    def test_edited_score_is_applied(self, title):
+        review = Review.objects.get(title=title, score=4)
+        review.score = 10
+        review.save()
+
+        assert get_totals(title) == (18, 2), (
+            'Проверьте, что изменение оценки меняет сумму оценок произведения'
+        )
+
+    def test_moved_review_changes_both_titles(self, title):
+        other = Title.objects.create(name='Другое произведение', year=2001)
+        review = Review.objects.get(title=title, score=8)
+        review.title = other
+        review.save()
+
+        assert get_totals(title) == (4, 1)
+        assert get_totals(other) == (8, 1)
+
+    def test_deleted_review_is_withdrawn(self, title):
+        Review.objects.get(title=title, score=8).delete()
+
+        assert get_totals(title) == (4, 1), (
+            'Проверьте, что удаление отзыва вычитает его оценку'
+        )
+
+    def test_save_of_fresh_instance_recounts_title(self, title):
+        review = Review.objects.get(title=title, score=4)
+        # Admin-style save of an instance not loaded from the database.
+        Review(
+            pk=review.pk, title=title, author=review.author,
+            text=review.text, score=1, pub_date=review.pub_date,
+        ).save()
+
+        assert get_totals(title) == (9, 2), (
+            'Проверьте, что сохранение незагруженного отзыва пересчитывает '
+            'рейтинг произведения'
+        )
+
+    def test_loaded_review_remembers_stored_values(self, title):
+        review = Review.objects.get(title=title, score=4)
+
+        assert review._loaded_score == 4
+        assert review._loaded_title_id == title.pk
+
+
+@pytest.mark.django_db
+class TestRecountRatings:
+
+    def test_drifted_title_is_repaired(self, title):
+        Title.objects.filter(pk=title.pk).update(score_sum=1, review_count=7)
+        out = StringIO()
+        call_command('recountratings', stdout=out)
+
+        assert get_totals(title) == (12, 2)
+        assert 'Repaired ratings of 1 titles' in out.getvalue()
+
+    def test_check_leaves_totals_untouched(self, title):
+        Title.objects.filter(pk=title.pk).update(score_sum=1, review_count=7)
+        out = StringIO()
+        call_command('recountratings', '--check', stdout=out)
+
+        assert get_totals(title) == (1, 7), (
+            'Проверьте, что `--check` не исправляет рейтинги'
+        )
+        assert str(title.pk) in out.getvalue()
+
+    def test_consistent_titles_are_reported(self, title):
+        out = StringIO()
+        call_command('recountratings', stdout=out)
+
+        assert 'All title ratings are ok' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_backfill_counts_existing_reviews(title):
+    empty = Title.objects.create(name='Без отзывов', year=2001)
+    Title.objects.update(score_sum=0, review_count=0)
+    backfill.fill_rating_totals(apps, None)
+
+    assert get_totals(title) == (12, 2)
+    assert get_totals(empty) == (0, 0)
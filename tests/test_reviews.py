@@ -0,0 +1,269 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from reviews.models import Review, Title
+from users.models import User
+
+
+def create_reviews(count):
+    title = Title.objects.create(name='Произведение', year=2000)
+    for number in range(count):
+        author = User.objects.create(
+            username=f'user{number}', email=f'user{number}@yamdb.fake'
+        )
+        Review.objects.create(
+            title=title, author=author, text=f'Отзыв {number}', score=5
+        )
+    return title
+
+
+@pytest.mark.django_db
+class TestReviewPagination:
+
+    def test_page_number_pagination_is_default(self):
+        title = create_reviews(3)
+        response = APIClient().get(f'/api/v1/titles/{title.id}/reviews/')
+
+        assert response.status_code == 200
+        assert response.data['count'] == 3
+
+    def test_cursor_pagination_walks_all_reviews(self):
+        title = create_reviews(25)
+        url = f'/api/v1/titles/{title.id}/reviews/?pagination=cursor'
+        texts = []
+        while url:
+            response = APIClient().get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data, (
+                'Проверьте, что курсорная пагинация не считает количество '
+                'отзывов'
+            )
+            texts.extend(review['text'] for review in response.data['results'])
+            url = response.data['next']
+
+        assert texts == [f'Отзыв {number}' for number in range(25)]
+
+
+@pytest.fixture
+def author_client():
+    author = User.objects.create(
+        username='author', email='author@yamdb.fake'
+    )
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+def title_selects(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith('SELECT') and 'FROM "reviews_title"' in
+        query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestReviewWrites:
+
+    def test_title_is_fetched_once(self, author_client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        with CaptureQueriesContext(connection) as context:
+            response = author_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                {'text': 'Отзыв', 'score': 7},
+            )
+
+        assert response.status_code == 201
+        assert len(title_selects(context.captured_queries)) == 1, (
+            'Проверьте, что произведение загружается один раз за запрос'
+        )
+        assert not any(
+            'FROM "reviews_review"' in query['sql']
+            for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ), 'Проверьте, что повторный отзыв ловится ограничением базы'
+
+    def test_second_review_is_rejected(self, author_client):
+        title = Title.objects.create(name='Произведение', year=2000)
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        author_client.post(url, {'text': 'Отзыв', 'score': 7})
+
+        response = author_client.post(url, {'text': 'Ещё отзыв', 'score': 3})
+
+        assert response.status_code == 400
+        assert 'только один отзыв' in str(response.data)
+        title.refresh_from_db()
+        assert title.rating == 7
+
+    def test_missing_title_is_not_found(self, author_client):
+        response = author_client.post(
+            '/api/v1/titles/1/reviews/', {'text': 'Отзыв', 'score': 7}
+        )
+
+        assert response.status_code == 404
+
+    def test_comment_is_added_to_the_review(self, author_client):
+        title = create_reviews(1)
+        review = title.reviews.get()
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+
+        response = author_client.post(url, {'text': 'Комментарий'})
+
+        assert response.status_code == 201
+        assert review.comments.get().text == 'Комментарий'
+        response = author_client.get(
+            url + f'{review.comments.get().id}/')
+        assert response.data['review'] == review.id
+
+
+def user_selects(queries):
+    return [
+        query['sql'] for query in queries
+        if query['sql'].startswith('SELECT') and 'FROM "users_user"' in
+        query['sql']
+    ]
+
+
+@pytest.mark.django_db
+class TestReviewQueries:
+
+    def count_queries(self, client, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data)
+        assert response.status_code < 300, response.data
+        assert user_selects(context.captured_queries) == [], (
+            'Проверьте, что авторы не загружаются отдельными запросами'
+        )
+        return len(context.captured_queries)
+
+    @pytest.mark.parametrize('count', [2, 5])
+    def test_list_does_not_query_per_row(self, count):
+        title = create_reviews(count)
+        review = title.reviews.first()
+        for number in range(count):
+            review.comments.create(
+                author=review.author, text=f'Комментарий {number}')
+        client = APIClient()
+
+        # The title, the validators, the count and the page.
+        assert self.count_queries(
+            client, 'get', f'/api/v1/titles/{title.id}/reviews/') == 4
+        assert self.count_queries(
+            client, 'get',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        ) == 3
+
+    @pytest.mark.parametrize('count', [2, 5])
+    def test_sparse_list_does_not_query_per_row(self, count):
+        title = create_reviews(count)
+        review = title.reviews.first()
+        for number in range(count):
+            review.comments.create(
+                author=review.author, text=f'Комментарий {number}')
+        client = APIClient()
+
+        # The title, the validators, the count and the page.
+        assert self.count_queries(
+            client, 'get', f'/api/v1/titles/{title.id}/reviews/?fields=text'
+        ) == 4, (
+            'Проверьте, что отзывы без поля title не загружаются по одному'
+        )
+        assert self.count_queries(
+            client, 'get',
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+            '?fields=id,text'
+        ) == 3, (
+            'Проверьте, что комментарии без поля review не загружаются по '
+            'одному'
+        )
+
+    def test_author_changes_review_without_user_lookups(self):
+        title = create_reviews(1)
+        review = title.reviews.get()
+        review.comments.create(author=review.author, text='Комментарий')
+        client = APIClient()
+        client.force_authenticate(review.author)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+
+        # The validators and the review.
+        assert self.count_queries(client, 'get', url) == 2
+        self.count_queries(client, 'patch', url, {'score': 9})
+        title.refresh_from_db()
+        assert title.rating == 9
+        self.count_queries(client, 'delete', url)
+        assert not Review.objects.exists()
+
+    def test_author_changes_comment_without_user_lookups(self):
+        title = create_reviews(1)
+        review = title.reviews.get()
+        comment = review.comments.create(
+            author=review.author, text='Комментарий')
+        client = APIClient()
+        client.force_authenticate(review.author)
+        url = (f'/api/v1/titles/{title.id}/reviews/{review.id}'
+               f'/comments/{comment.id}/')
+
+        assert self.count_queries(client, 'get', url) == 1
+        self.count_queries(client, 'patch', url, {'text': 'Правка'})
+        comment.refresh_from_db()
+        assert comment.text == 'Правка'
+        self.count_queries(client, 'delete', url)
+        assert not review.comments.exists()
+
+    def test_other_user_cannot_change_review(self):
+        title = create_reviews(2)
+        review, other = title.reviews.order_by('id')
+        client = APIClient()
+        client.force_authenticate(other.author)
+
+        response = client.patch(
+            f'/api/v1/titles/{title.id}/reviews/{review.id}/', {'score': 1})
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestCommentExpansion:
+
+    def create_comments(self, count):
+        title = create_reviews(1)
+        review = title.reviews.get()
+        for number in range(count):
+            review.comments.create(
+                author=review.author, text=f'Комментарий {number}')
+        return (f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/',
+                review)
+
+    def test_comments_refer_to_review_id(self):
+        url, review = self.create_comments(2)
+
+        response = APIClient().get(url)
+
+        assert [
+            comment['review'] for comment in response.data['results']
+        ] == [review.id, review.id], (
+            'Проверьте, что комментарий содержит только id отзыва'
+        )
+
+    @pytest.mark.parametrize('count', [2, 5])
+    def test_expanded_review_is_embedded(self, count):
+        url, review = self.create_comments(count)
+
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(url + '?expand=review')
+
+        assert len(context.captured_queries) == 3
+        embedded = response.data['results'][0]['review']
+        assert embedded['id'] == review.id
+        assert embedded['text'] == review.text
+        assert embedded['author'] == review.author.username
+        assert embedded['title'] == review.title.name
+
+        comment = review.comments.first()
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(f'{url}{comment.id}/?expand=review')
+
+        assert len(context.captured_queries) == 1
+        assert response.data['review']['text'] == review.text
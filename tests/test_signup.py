@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+import pytest
+from django.core import mail
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.mail import send_queued_mail
+from users.models import FAILED, PENDING, SENT, QueuedEmail, User
+
+
+def signup(username='reader', email='reader@yamdb.fake'):
+    return APIClient().post(
+        '/api/v1/auth/signup/', {'username': username, 'email': email}
+    )
+
+
+class BrokenBackend:
+
+    def __init__(self, **kwargs):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP server is unavailable')
+
+
+@pytest.mark.django_db
+class TestSignupMail:
+
+    def test_signup_queues_confirmation_mail(self):
+        response = signup()
+
+        assert response.status_code == 200
+        assert len(mail.outbox) == 0, (
+            'Проверьте, что письмо не отправляется во время запроса'
+        )
+        queued = QueuedEmail.objects.get()
+        assert queued.to == 'reader@yamdb.fake'
+
+        assert send_queued_mail() == (1, 0)
+        assert len(mail.outbox) == 1
+        assert 'Ваш код доступа к API' in mail.outbox[0].body
+        queued.refresh_from_db()
+        assert queued.status == SENT
+
+    def test_failed_mail_is_retried_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_signup.BrokenBackend'
+        settings.MAIL_QUEUE_MAX_ATTEMPTS = 2
+        signup()
+
+        assert send_queued_mail() == (0, 1)
+        queued = QueuedEmail.objects.get()
+        assert queued.status == PENDING
+        assert queued.attempts == 1
+        assert queued.next_attempt_at > timezone.now()
+        assert send_queued_mail() == (0, 0), (
+            'Проверьте, что повторная отправка откладывается'
+        )
+
+        QueuedEmail.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1))
+        assert send_queued_mail() == (0, 1)
+        queued.refresh_from_db()
+        assert queued.status == FAILED
+
+
+@pytest.mark.django_db
+class TestSignupQueries:
+
+    def test_known_user_is_resolved_with_one_query(self):
+        signup()
+        with CaptureQueriesContext(connection) as context:
+            response = signup()
+
+        assert response.status_code == 200
+        user_queries = [
+            query['sql'] for query in context.captured_queries
+            if 'users_user' in query['sql']
+        ]
+        assert len(user_queries) == 1, (
+            'Проверьте, что пользователь находится одним запросом'
+        )
+        assert QueuedEmail.objects.count() == 2
+
+    def test_taken_username_or_email_is_rejected(self):
+        signup()
+
+        assert signup(email='other@yamdb.fake').status_code == 400
+        assert signup(username='other').status_code == 400
+        assert signup(
+            username='other', email='Reader@YaMDb.fake'
+        ).status_code == 400, (
+            'Проверьте, что почта уникальна без учёта регистра'
+        )
+        assert signup(email='Reader@yamdb.fake').status_code == 200
+
+    def test_email_is_unique_regardless_of_case(self):
+        User.objects.create(username='reader', email='reader@yamdb.fake')
+
+        with pytest.raises(IntegrityError):
+            User.objects.create(username='other', email='READER@yamdb.fake')
+
+
+@pytest.mark.django_db
+class TestUserEmail:
+
+    def test_admin_cannot_reuse_email_in_another_case(self, admin_client):
+        User.objects.create(username='reader', email='reader@yamdb.fake')
+
+        response = admin_client.post('/api/v1/users/', {
+            'username': 'other', 'email': 'Reader@YaMDb.fake',
+        })
+
+        assert response.status_code == 400, (
+            'Проверьте, что почта уникальна без учёта регистра'
+        )
+        assert 'email' in response.data
+
+    def test_user_cannot_take_email_in_another_case(self, token_client):
+        User.objects.create(username='reader', email='reader@yamdb.fake')
+        user = User.objects.create(username='other', email='other@yamdb.fake')
+        client = token_client(user)
+
+        response = client.patch(
+            '/api/v1/users/me/', {'email': 'READER@yamdb.fake'})
+        assert response.status_code == 400
+        assert 'email' in response.data
+
+        response = client.patch(
+            '/api/v1/users/me/', {'email': 'Other@yamdb.fake'})
+        assert response.status_code == 200, (
+            'Проверьте, что пользователь может сменить регистр своей почты'
+        )
@@ -0,0 +1,91 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api_yamdb import slowqueries
+from reviews.models import Category, Title
+
+
+@pytest.fixture(autouse=True)
+def slow_query_dir(settings, tmp_path):
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_DIR = str(tmp_path)
+    slowqueries._explained.clear()
+    yield tmp_path
+    slowqueries._explained.clear()
+
+
+def read_log(directory):
+    with open(directory / 'queries.jsonl') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_literals_are_normalized():
+    assert slowqueries.normalize(
+        "SELECT *  FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21"
+    ) == 'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?'
+    assert slowqueries.normalize(
+        'SELECT * FROM t WHERE b IN (%s)'
+    ) == slowqueries.normalize('SELECT * FROM t WHERE b IN (%s, %s)')
+
+
+@pytest.mark.django_db
+class TestSlowQueries:
+
+    def test_queries_are_logged_with_view_and_plan(self, slow_query_dir):
+        Title.objects.create(
+            name='Произведение', year=2000,
+            category=Category.objects.create(name='Фильм', slug='movie'))
+
+        response = APIClient().get('/api/v1/titles/?name=изв')
+
+        assert response.status_code == 200
+        queries = [
+            query for query in read_log(slow_query_dir)
+            if query['view'] == 'TitleViewSet.list'
+        ]
+        assert queries, 'Проверьте, что запросы связаны с представлением'
+        plans = list((slow_query_dir / 'plans').iterdir())
+        assert plans
+        assert not any(
+            query['sql'].startswith('EXPLAIN')
+            for query in read_log(slow_query_dir)
+        ), 'Проверьте, что EXPLAIN не попадает в журнал'
+
+    def test_plan_is_captured_once_per_fingerprint(self, slow_query_dir):
+        client = APIClient()
+        client.get('/api/v1/titles/?year=2000')
+        cache.clear()
+        plans = {path.name for path in (slow_query_dir / 'plans').iterdir()}
+        slowqueries._explained.clear()
+
+        client.get('/api/v1/titles/?year=2001')
+
+        assert {
+            path.name for path in (slow_query_dir / 'plans').iterdir()
+        } == plans
+
+    def test_disabled_threshold_logs_nothing(self, settings, slow_query_dir):
+        settings.SLOW_QUERY_THRESHOLD_MS = None
+
+        APIClient().get('/api/v1/titles/')
+
+        assert not list(slow_query_dir.iterdir())
+
+    def test_command_aggregates_by_fingerprint(self):
+        client = APIClient()
+        for name in ('а', 'б'):
+            client.get('/api/v1/titles/', {'name': name})
+
+        out = StringIO()
+        call_command('slowqueries', plans=True, stdout=out)
+
+        output = out.getvalue()
+        assert 'TitleViewSet.list (2)' in output, (
+            'Проверьте, что запросы группируются по отпечатку'
+        )
+        assert 'SCAN' in output
@@ -0,0 +1,52 @@
+import json
+import logging
+
+import pytest
+from rest_framework.test import APIClient
+
+from reviews.models import Genre
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in header.split(', '):
+        name, *params = entry.split(';')
+        timings[name] = dict(param.split('=', 1) for param in params)
+    return timings
+
+
+@pytest.mark.django_db
+class TestRequestTiming:
+
+    def test_sampled_request_reports_timings(self, settings, caplog):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 1
+        Genre.objects.create(name='Драма', slug='drama')
+
+        with caplog.at_level(logging.INFO, logger='api_yamdb.timing'):
+            response = APIClient().get('/api/v1/genres/')
+
+        timings = parse_server_timing(response['Server-Timing'])
+        assert set(timings) == {'db', 'view', 'serialize', 'render', 'total'}
+        assert timings['db']['desc'] == '"2 queries"'
+        assert float(timings['total']['dur']) >= float(
+            timings['view']['dur'])
+        assert 0 < float(timings['serialize']['dur']) <= float(
+            timings['view']['dur']), (
+            'Проверьте, что время сериализации входит во время представления'
+        )
+        record = json.loads(caplog.records[-1].getMessage())
+        assert record['view'] == 'GenreViewSet'
+        assert record['action'] == 'list'
+        assert record['queries'] == 2
+        assert record['status'] == 200
+        assert record['serialize_ms'] > 0
+
+    def test_disabled_sampling_adds_nothing(self, settings, caplog):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+        with caplog.at_level(logging.INFO, logger='api_yamdb.timing'):
+            response = APIClient().get('/api/v1/genres/')
+
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response
+        assert not caplog.records
@@ -0,0 +1,435 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.management.commands.adviseindexes import find_problems
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+
+def create_titles(count):
+    category, _ = Category.objects.get_or_create(name='Фильм', slug='movie')
+    genres = [
+        Genre.objects.get_or_create(name='Драма', slug='drama')[0],
+        Genre.objects.get_or_create(name='Комедия', slug='comedy')[0],
+    ]
+    start = Title.objects.count()
+    for number in range(start, start + count):
+        title = Title.objects.create(
+            name=f'Произведение {number}', year=2000, category=category
+        )
+        title.genre.set(genres)
+
+
+def count_queries(url):
+    client = APIClient()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET-запрос к `{url}` возвращает статус 200'
+    )
+    return len(context), response
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        create_titles(2)
+        small_page_queries, _ = count_queries('/api/v1/titles/')
+        create_titles(8)
+        full_page_queries, response = count_queries('/api/v1/titles/')
+
+        assert len(response.data['results']) == 10
+        assert small_page_queries == full_page_queries, (
+            'Проверьте, что количество запросов к БД при получении списка '
+            'произведений не зависит от размера страницы'
+        )
+
+    def test_retrieve_loads_category_and_genres(self):
+        create_titles(1)
+        title = Title.objects.get()
+        queries, response = count_queries(f'/api/v1/titles/{title.id}/')
+
+        assert response.data['category']['slug'] == 'movie'
+        assert len(response.data['genre']) == 2
+        # Validators, the title with its category and the genres.
+        assert queries == 3, (
+            'Проверьте, что произведение загружается вместе с категорией '
+            'одним запросом, а жанры - одним дополнительным запросом'
+        )
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def search(self, text):
+        response = APIClient().get('/api/v1/titles/', {'q': text})
+        assert response.status_code == 200
+        return [title['name'] for title in response.data['results']]
+
+    def test_search_orders_by_relevance(self):
+        Title.objects.create(
+            name='Мастер и Маргарита', year=1967,
+            description='Роман о дьяволе, посетившем Москву'
+        )
+        Title.objects.create(
+            name='Москва - Петушки', year=1970, description='Поэма'
+        )
+
+        assert self.search('моск') == [
+            'Москва - Петушки', 'Мастер и Маргарита'
+        ], (
+            'Проверьте, что совпадения в названии выше совпадений в описании'
+        )
+        assert self.search('маргарит') == ['Мастер и Маргарита']
+        assert self.search('гамлет') == []
+
+    def test_search_index_follows_saves_and_deletes(self):
+        title = Title.objects.create(name='Гамлет', year=1600)
+        assert self.search('гамлет') == ['Гамлет']
+
+        title.name = 'Король Лир'
+        title.save()
+        assert self.search('гамлет') == []
+        assert self.search('лир') == ['Король Лир']
+
+        title.delete()
+        assert self.search('лир') == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_indexed_titles_can_be_flushed():
+    Title.objects.create(name='Гамлет', year=1600)
+
+    call_command('flush', interactive=False, verbosity=0)
+
+    assert not Title.objects.exists(), (
+        'Проверьте, что таблица поиска не мешает очистке базы'
+    )
+    title = Title.objects.create(name='Король Лир', year=1606)
+    response = APIClient().get('/api/v1/titles/', {'q': 'гамлет'})
+    assert response.data['results'] == []
+    response = APIClient().get('/api/v1/titles/', {'q': 'лир'})
+    assert [item['id'] for item in response.data['results']] == [title.id]
+
+
+@pytest.mark.django_db
+class TestTitleFilters:
+
+    def filter(self, **params):
+        response = APIClient().get('/api/v1/titles/', params)
+        assert response.status_code == 200
+        return sorted(title['name'] for title in response.data['results'])
+
+    def test_genre_and_category_filters(self):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        Genre.objects.create(name='Драмеди', slug='dramedy')
+        both = Title.objects.create(name='Оба', year=2000, category=movie)
+        both.genre.set([drama, comedy])
+        Title.objects.create(
+            name='Драма', year=2000, category=book
+        ).genre.set([drama])
+
+        assert self.filter(genre='drama,comedy') == ['Драма', 'Оба'], (
+            'Проверьте, что произведения с несколькими подходящими жанрами '
+            'не повторяются'
+        )
+        assert self.filter(genre='drama,comedy', genre_mode='all') == [
+            'Оба'
+        ]
+        assert self.filter(genre='dram') == [], (
+            'Проверьте, что жанр фильтруется по точному совпадению slug'
+        )
+        assert self.filter(category='book') == ['Драма']
+        assert self.filter(category='book,movie') == ['Драма', 'Оба']
+
+    def test_year_range_and_ordering(self):
+        for name, year in (('Старое', 1950), ('Среднее', 1980),
+                           ('Новое', 2010)):
+            Title.objects.create(name=name, year=year)
+
+        assert self.filter(year=1980) == ['Среднее']
+        assert self.filter(year_min=1960, year_max=2010) == [
+            'Новое', 'Среднее'
+        ]
+        response = APIClient().get('/api/v1/titles/', {'ordering': '-year'})
+        assert [title['year'] for title in response.data['results']] == [
+            2010, 1980, 1950
+        ]
+
+
+def capture(url):
+    with CaptureQueriesContext(connection) as context:
+        response = APIClient().get(url)
+    assert response.status_code == 200
+    return [query['sql'] for query in context.captured_queries], response
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_cards_load_only_listed_fields(self):
+        create_titles(3)
+        queries, response = capture(
+            '/api/v1/titles/?fields=id,name,rating')
+
+        assert [set(title) for title in response.data['results']] == [
+            {'id', 'name', 'rating'}] * 3
+        assert len(queries) == 3, (
+            'Проверьте, что жанры не загружаются, если их нет в `fields`'
+        )
+        select = queries[-1]
+        assert 'description' not in select
+        assert 'reviews_category' not in select
+        assert 'score_sum' in select
+
+    def test_all_fields_are_rendered_by_default(self):
+        create_titles(1)
+        title = Title.objects.get()
+        queries, response = capture(
+            f'/api/v1/titles/{title.id}/?fields=name,genre')
+
+        assert set(response.data) == {'name', 'genre'}
+        assert len(queries) == 3
+        assert 'reviews_category' not in queries[0]
+
+        queries, response = capture(f'/api/v1/titles/{title.id}/')
+        assert set(response.data) == {
+            'id', 'name', 'year', 'description', 'category', 'genre',
+            'rating',
+        }
+        assert len(queries) == 3
+
+    def test_writes_ignore_fields(self):
+        category = Category.objects.create(name='Фильм', slug='movie')
+        Genre.objects.create(name='Драма', slug='drama')
+        client = APIClient()
+        client.force_authenticate(User.objects.create(
+            username='admin', email='admin@yamdb.fake', role='admin'))
+
+        response = client.post(
+            '/api/v1/titles/?fields=name',
+            {'name': 'Фильм', 'year': 2000, 'category': category.slug,
+             'genre': ['drama']},
+        )
+
+        assert response.status_code == 201
+        assert response.data['category'] == 'movie'
+
+
+@pytest.mark.django_db
+class TestTitleWrites:
+
+    def create_title(self, client, genres):
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/titles/', {
+                'name': 'Произведение', 'year': 2000,
+                'category': 'movie', 'genre': genres,
+            }, format='json')
+        return len(context), response
+
+    def test_genres_cost_constant_queries(self, admin_client):
+        Category.objects.create(name='Фильм', slug='movie')
+        genres = [f'genre-{number}' for number in range(10)]
+        for slug in genres:
+            Genre.objects.create(name=slug, slug=slug)
+
+        one_genre_queries, response = self.create_title(
+            admin_client, genres[:1])
+        assert response.status_code == 201
+        ten_genres_queries, response = self.create_title(
+            admin_client, genres)
+
+        assert response.status_code == 201
+        assert response.data['genre'] == genres
+        assert Title.objects.last().genre.count() == 10
+        assert one_genre_queries == ten_genres_queries, (
+            'Проверьте, что количество запросов не зависит от числа жанров'
+        )
+
+    def test_every_unknown_genre_is_reported(self, admin_client):
+        Category.objects.create(name='Фильм', slug='movie')
+        Genre.objects.create(name='Драма', slug='drama')
+
+        _, response = self.create_title(
+            admin_client, ['drama', 'western', 'noir'])
+
+        assert response.status_code == 400
+        assert 'western, noir' in str(response.data['genre'])
+        assert not Title.objects.exists()
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+
+    def test_unchanged_list_is_not_modified(self):
+        create_titles(3)
+        client = APIClient()
+        etag = client.get('/api/v1/titles/')['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert len(context) == 1, (
+            'Проверьте, что ответ 304 не загружает произведения'
+        )
+
+    @pytest.mark.parametrize('change', [
+        lambda: Genre.objects.get(slug='drama').save(),
+        lambda: Category.objects.get(slug='movie').save(),
+        lambda: Title.objects.first().genre.clear(),
+        lambda: Title.objects.first().delete(),
+        lambda: create_titles(1),
+    ])
+    def test_changes_are_detected(self, change):
+        create_titles(3)
+        client = APIClient()
+        etag = client.get('/api/v1/titles/')['ETag']
+
+        change()
+
+        response = client.get('/api/v1/titles/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_title_is_not_modified_since(self):
+        create_titles(1)
+        title = Title.objects.get()
+        url = f'/api/v1/titles/{title.id}/'
+        client = APIClient()
+        last_modified = client.get(url)['Last-Modified']
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == 304
+        assert client.get(
+            '/api/v1/titles/100/', HTTP_IF_MODIFIED_SINCE=last_modified
+        ).status_code == 404
+        assert 'Last-Modified' not in client.get('/api/v1/titles/'), (
+            'Проверьте, что список не отдаёт Last-Modified, '
+            'не отражающий удаления'
+        )
+
+    def test_new_review_changes_title_and_reviews(self):
+        create_titles(1)
+        title = Title.objects.get()
+        client = APIClient()
+        urls = [f'/api/v1/titles/{title.id}/',
+                f'/api/v1/titles/{title.id}/reviews/']
+        etags = [client.get(url)['ETag'] for url in urls]
+
+        Review.objects.create(
+            title=title, text='Отзыв', score=8,
+            author=User.objects.create(
+                username='reader', email='reader@yamdb.fake'))
+
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+
+    def test_edited_review_is_modified(self):
+        create_titles(1)
+        title = Title.objects.get()
+        author = User.objects.create(
+            username='reader', email='reader@yamdb.fake')
+        review = Review.objects.create(
+            title=title, text='Отзыв', score=8, author=author)
+        client = APIClient()
+        client.force_authenticate(author)
+        urls = [f'/api/v1/titles/{title.id}/reviews/',
+                f'/api/v1/titles/{title.id}/reviews/{review.id}/']
+        etags = [client.get(url)['ETag'] for url in urls]
+
+        response = client.patch(urls[1], {'text': 'Новый отзыв'})
+
+        assert response.status_code == 200
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200, (
+                'Проверьте, что изменение текста отзыва меняет ETag'
+            )
+            assert 'Новый отзыв' in response.content.decode()
+
+    def test_renamed_author_modifies_reviews(self):
+        create_titles(1)
+        title = Title.objects.get()
+        author = User.objects.create(
+            username='reader', email='reader@yamdb.fake')
+        Review.objects.create(
+            title=title, text='Отзыв', score=8, author=author)
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=author.pk))
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        etag = client.get(url)['ETag']
+
+        client.patch('/api/v1/users/me/', {'username': 'writer'})
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что смена имени автора меняет ETag отзывов'
+        )
+        assert response.data['results'][0]['author'] == 'writer'
+
+
+@pytest.mark.django_db
+class TestIndexAdvisor:
+
+    def test_replayed_queries_use_indexes(self):
+        create_titles(3)
+        if connection.vendor == 'postgresql':
+            # PostgreSQL reads a table of three rows without its indexes.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+
+        out = StringIO()
+        call_command('adviseindexes', repeat=1, stdout=out)
+
+        output = out.getvalue()
+        assert 'GET /api/v1/titles/?ordering=name: 200' in output
+        assert 'No missing indexes' in output, (
+            'Проверьте, что сортировки списка произведений используют индексы'
+        )
+
+    def test_replayed_query_strings_are_encoded(self):
+        Title.objects.create(name='R&B #1', year=2000)
+
+        out = StringIO()
+        call_command('adviseindexes', repeat=1, stdout=out)
+
+        assert 'GET /api/v1/titles/?name=%26B+: 200' in out.getvalue(), (
+            'Проверьте, что параметры запросов кодируются'
+        )
+
+    def test_sort_without_index_is_reported(self):
+        sql = (
+            'SELECT "reviews_title"."id" FROM "reviews_title"'
+            ' ORDER BY "reviews_title"."name" ASC, "reviews_title"."id" ASC'
+            ' LIMIT 10'
+        )
+        if connection.vendor == 'postgresql':
+            plan = (
+                'Limit\n  ->  Sort\n        Sort Key: name, id\n'
+                '        ->  Seq Scan on reviews_title'
+            )
+        else:
+            plan = 'SCAN reviews_title\nUSE TEMP B-TREE FOR ORDER BY'
+
+        assert find_problems(sql, plan, {'reviews_title'}) == [
+            ('sort of reviews_title', 'reviews_title (name, id)'),
+        ]
+
+    def test_nothing_to_replay(self):
+        with pytest.raises(CommandError):
+            call_command('adviseindexes', stdout=StringIO())